@@ -0,0 +1,106 @@
+"""
+Read-through cache of API responses in Redis.
+
+Keys embed a global data-generation counter: every write path (scrape batches,
+status updates, archive/reclassify tasks) calls bump_data_generation() and all
+previous entries stop being read at once, no key scanning needed; they simply
+expire. Concurrent misses on the same key are coalesced with a short SET NX lock:
+one request runs the query, the others wait for its result.
+Redis is optional here: any Redis error falls back to calling the loader.
+"""
+import datetime
+import hashlib
+import json
+import logging
+import time
+from typing import Optional
+
+from core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+DATA_GENERATION_KEY = "cache:data_generation"
+DEFAULT_TTL = 300
+# Upper bound of a single load; waiters give up (and query themselves) after it
+LOCK_TTL = 10.0
+POLL_INTERVAL = 0.05
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+def data_generation() -> int:
+    value = get_redis().get(DATA_GENERATION_KEY)
+    return int(value) if value else 0
+
+def bump_data_generation() -> None:
+    """Invalidate every cached response. Failures only mean stale entries until their TTL."""
+    try:
+        get_redis().incr(DATA_GENERATION_KEY)
+    except Exception as e:
+        logger.warning(f"Could not bump cache data generation: {e}")
+
+def cache_key(namespace: str, params: dict, generation: int) -> str:
+    """Normalized params: key order and None values do not matter."""
+    normalized = {k: v for k, v in params.items() if v is not None}
+    digest = hashlib.sha1(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()
+    return f"cache:{namespace}:{generation}:{digest}"
+
+def etag(namespace: str, params: dict) -> Optional[str]:
+    """
+    Version token of a response: changes with the data generation, the params and
+    the (UTC) day, since days_active moves at midnight. None when Redis is unavailable.
+    """
+    try:
+        generation = data_generation()
+    except Exception as e:
+        logger.warning(f"Cache unavailable, no ETag: {e}")
+        return None
+    today = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+    digest = cache_key(namespace, params, generation).rsplit(":", 1)[-1][:16]
+    return f'W/"{generation}-{today}-{digest}"'
+
+def cached(namespace: str, params: dict, loader, ttl: int = DEFAULT_TTL):
+    """
+    Return loader() through the cache. The value must be JSON-serializable
+    (datetimes come back as ISO strings on a hit, which is what the API sends anyway).
+    """
+    try:
+        client = get_redis()
+        key = cache_key(namespace, params, data_generation())
+        payload = client.get(key)
+    except Exception as e:
+        logger.warning(f"Cache unavailable, querying directly: {e}")
+        return loader()
+    if payload is not None:
+        return json.loads(payload)
+
+    lock_key = f"{key}:lock"
+    try:
+        owner = client.set(lock_key, 1, nx=True, px=int(LOCK_TTL * 1000))
+        if not owner:
+            # Someone else is loading this key: wait for their result
+            deadline = time.monotonic() + LOCK_TTL
+            while time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+                payload = client.get(key)
+                if payload is not None:
+                    return json.loads(payload)
+                if not client.exists(lock_key):
+                    break
+    except Exception as e:
+        logger.warning(f"Cache lock failed, querying directly: {e}")
+        return loader()
+
+    try:
+        value = loader()
+        try:
+            client.set(key, json.dumps(value, default=_json_default), ex=ttl)
+        except Exception as e:
+            logger.warning(f"Could not store {namespace} in cache: {e}")
+        return value
+    finally:
+        if owner:
+            try:
+                client.delete(lock_key)
+            except Exception:
+                pass
@@ -0,0 +1,12 @@
+import redis
+
+from core.worker import REDIS_URL
+
+_client = None
+
+def get_redis() -> redis.Redis:
+    """Shared Redis connection (same instance Celery uses as broker)."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(REDIS_URL)
+    return _client
@@ -22,6 +22,15 @@ celery_app.conf.update(
             "schedule": 86400.0, # Every 24 hours
             "args": (3,), # Age in days
         },
+        "move-archived-properties-daily": {
+            "task": "move_archived_properties",
+            "schedule": 86400.0,
+            "args": (30,), # Days without being seen before leaving the hot table
+        },
+        "reclassify-properties-on-map-change": {
+            "task": "reclassify_properties",
+            "schedule": 900.0, # Cheap no-op unless the neighborhood map version in the DB changed
+        },
     },
 )
 
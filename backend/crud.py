@@ -1,6 +1,20 @@
+from sqlalchemy import Integer, and_, any_, bindparam, cast, delete, false, func, literal_column, or_, select, text, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from models import Property
+from sqlalchemy.sql.util import ClauseAdapter
+from models import Property, PropertyChange, SavedSearch, SavedSearchMatch, properties_archive, property_stats
+from saved_searches import match_rows
+from geo import EARTH_RADIUS_KM, covering_prefixes
+from dedup import assign_clusters, candidates_query, cluster_update, dedupe_batch, fingerprint_insert, singleton_clusters
+import base64
+import binascii
 import datetime
+import json
+import math
+
+# Fields that mark a seen listing as "updated" when they change
+TRACKED_FIELDS = ("price", "area", "bedrooms", "bathrooms")
 
 def get_property_by_link(db: Session, link: str):
     return db.query(Property).filter(Property.link == link).first()
@@ -19,10 +33,11 @@ def update_property_last_seen(db: Session, db_property: Property):
     db.refresh(db_property)
 
 def update_property_price(db: Session, db_property: Property, new_price: float):
-    # Here we could implement history tracking in another table if needed.
-    # For now, just update.
     if db_property.price != new_price:
-        # TODO: Log price change?
+        db.add(PropertyChange(
+            property_id=db_property.id, field="price",
+            old_value=db_property.price, new_value=new_price, sector=db_property.sector,
+        ))
         db_property.price = new_price
     db.commit()
 
@@ -33,6 +48,518 @@ def update_property_metadata(db: Session, db_property: Property, data: dict):
     db_property.bathrooms = data.get("bathrooms", db_property.bathrooms)
     db.commit()
 
+def _dedupe_by_link(batch: list) -> dict:
+    rows = {}
+    for data in batch:
+        rows.setdefault(data["link"], data)
+    return rows
+
+def _tracked_fields_query(links: list):
+    """Current tracked fields of the links that are already stored."""
+    return select(
+        Property.id, Property.link, Property.sector, *(getattr(Property, f) for f in TRACKED_FIELDS)
+    ).where(Property.link.in_(links))
+
+def _upsert_statement(rows: dict):
+    """
+    INSERT ... ON CONFLICT (link) DO UPDATE ... RETURNING id, link, (xmax = 0) for a deduplicated batch.
+    Conflicting rows are only rewritten when a tracked field changes; unchanged
+    listings are not returned and get their last_seen from touch_properties().
+    """
+    columns = Property.__table__.columns
+    keys = sorted({key for data in rows.values() for key in data if key in columns})
+    values = [{key: data.get(key) for key in keys} for data in rows.values()]
+
+    stmt = insert(Property).values(values)
+    excluded = stmt.excluded
+    update = {
+        "last_seen": datetime.datetime.now(datetime.timezone.utc),
+        "active": True,
+        "updated_at": func.now(),
+    }
+    changed = []
+    for field in TRACKED_FIELDS:
+        if field in keys:
+            new_value, old_value = getattr(excluded, field), getattr(Property, field)
+            # A missing price/metadata keeps the stored value (same rule as _change_rows)
+            update[field] = func.coalesce(new_value, old_value)
+            changed.append(new_value.isnot(None) & old_value.is_distinct_from(new_value))
+
+    return stmt.on_conflict_do_update(
+        index_elements=[Property.link], set_=update, where=or_(false(), *changed)
+    ).returning(
+        Property.id, Property.link, literal_column("xmax = 0").label("inserted")
+    )
+
+def _touch_statement(ids: list):
+    """One set-based last_seen refresh for listings seen without changes."""
+    return update(Property).where(
+        Property.id == any_(bindparam("ids", list(ids), type_=ARRAY(Integer)))
+    ).values(last_seen=func.now(), active=True)
+
+def _unchanged_ids(previous: dict, returned: dict) -> list:
+    return [row.id for link, row in previous.items() if link not in returned]
+
+def _is_change(new_value, old_value) -> bool:
+    """Missing values are not written (COALESCE), so they are not a change either."""
+    return new_value is not None and new_value != old_value
+
+def _change_rows(rows: dict, previous: dict) -> list:
+    """property_changes rows for the tracked fields that the upsert actually overwrote."""
+    changes = []
+    for link, old in previous.items():
+        data = rows[link]
+        for field in TRACKED_FIELDS:
+            new_value = data.get(field)
+            old_value = getattr(old, field)
+            if _is_change(new_value, old_value):
+                changes.append({
+                    "property_id": old.id, "field": field,
+                    "old_value": old_value, "new_value": new_value, "sector": old.sector,
+                })
+    return changes
+
+def _saved_searches_query():
+    return select(SavedSearch.id, SavedSearch.criteria)
+
+def _match_insert(matches: list):
+    """Inbox rows for saved searches; a listing is only recorded once per search."""
+    return insert(SavedSearchMatch).values(matches).on_conflict_do_nothing()
+
+def _new_items(rows: dict, returned) -> list:
+    """(id, data) of the listings inserted by the upsert (duplicate detection input)."""
+    return [(row.id, rows[row.link]) for row in returned if row.inserted]
+
+# Columns a restore writes back (search_text is generated by the hot table)
+_RESTORED_COLUMNS = [c.name for c in Property.__table__.columns if c.name != "search_text"]
+
+def _restore_statement(condition):
+    """
+    Move the properties_archive rows matching `condition` back to properties, with
+    their id and status (their history, fingerprint and matches never left).
+    Only the rows the INSERT actually wrote leave the archive: a link that is
+    already live (ON CONFLICT) keeps its archived copy.
+    """
+    restored = insert(Property).from_select(
+        _RESTORED_COLUMNS,
+        select(*(properties_archive.c[name] for name in _RESTORED_COLUMNS)).where(condition),
+    ).on_conflict_do_nothing().returning(Property.id, Property.link).cte("restored")
+    return properties_archive.delete().where(
+        properties_archive.c.link == restored.c.link, properties_archive.c.id == restored.c.id
+    )
+
+def _archived_links_query(links: list):
+    """Links of the batch present in properties_archive (ix_properties_archive_link)."""
+    return select(properties_archive.c.link).where(properties_archive.c.link.in_(links))
+
+def restore_archived_property(db: Session, property_id: int) -> bool:
+    """Move one listing back from properties_archive; False when it is not there."""
+    count = db.execute(_restore_statement(properties_archive.c.id == property_id)).rowcount
+    db.commit()
+    return bool(count)
+
+def _upsert_statuses(batch: list, rows: dict, previous: dict, inserted: dict) -> list:
+    statuses = {}
+    for link, data in rows.items():
+        old = previous.get(link)
+        if inserted.get(link) or old is None:
+            # Not in the SELECT: new, or inserted concurrently by another worker
+            statuses[link] = "new" if inserted.get(link) else "existing"
+        elif any(_is_change(data.get(f), getattr(old, f)) for f in TRACKED_FIELDS):
+            statuses[link] = "updated"
+        else:
+            statuses[link] = "existing"
+    # Repeated links in the same batch count as already seen
+    result, seen = [], set()
+    for data in batch:
+        result.append("existing" if data["link"] in seen else statuses[data["link"]])
+        seen.add(data["link"])
+    return result
+
+def upsert_properties(db: Session, batch: list, seen_ids: set = None) -> list:
+    """
+    Save a page of properties in one transaction.
+    One SELECT fetches the current tracked fields of the links already stored,
+    one INSERT ... ON CONFLICT (link) DO UPDATE inserts the new ones and rewrites
+    the ones whose price/metadata changed. Repeated links in the batch are saved once.
+    Overwritten tracked fields are appended to property_changes in the same transaction.
+    New and changed listings are checked against every saved search and the hits
+    recorded in saved_search_matches, also in the same transaction.
+    New listings are fingerprinted and joined to the listing_cluster_id of their
+    duplicates on other portals (dedup.py).
+    Listings seen again after being moved to properties_archive are moved back
+    first, so they keep their id and status instead of coming back as new.
+
+    The ids of listings seen without changes are added to `seen_ids` so the caller
+    can refresh them all at once with touch_properties(); without it they are
+    refreshed here with one UPDATE for the page.
+
+    Returns one status per item of `batch`: 'new', 'updated' or 'existing'.
+    """
+    rows = _dedupe_by_link(batch)
+    if not rows:
+        return []
+
+    try:
+        # Relisted links come back from the archive; a batch without any skips the restore
+        archived = db.execute(_archived_links_query(list(rows))).scalars().all()
+        if archived:
+            db.execute(_restore_statement(properties_archive.c.link.in_(archived)))
+        previous = {row.link: row for row in db.execute(_tracked_fields_query(list(rows)))}
+        returned = db.execute(_upsert_statement(rows)).all()
+        inserted = {row.link: row.inserted for row in returned}
+        changes = _change_rows(rows, previous)
+        if changes:
+            db.execute(insert(PropertyChange), changes)
+        matches = match_rows(db.execute(_saved_searches_query()).all(), rows, returned) if returned else []
+        if matches:
+            db.execute(_match_insert(matches))
+        new_items = _new_items(rows, returned)
+        fingerprints, bands = dedupe_batch(new_items)
+        fp_rows, clusters = assign_clusters(fingerprints, db.execute(candidates_query(bands)).all() if bands else [])
+        if fp_rows:
+            db.execute(fingerprint_insert(fp_rows))
+        # New listings with no price and no area start their own cluster (as in the backfill)
+        clusters += singleton_clusters([pid for pid, _ in new_items], clusters)
+        if clusters:
+            db.execute(cluster_update(), clusters)
+        unchanged = _unchanged_ids(previous, inserted)
+        if seen_ids is not None:
+            seen_ids.update(unchanged)
+        elif unchanged:
+            db.execute(_touch_statement(unchanged))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return _upsert_statuses(batch, rows, previous, inserted)
+
+async def upsert_properties_async(session: AsyncSession, batch: list, seen_ids: set = None) -> list:
+    """Same as upsert_properties, on an AsyncSession (asyncpg)."""
+    rows = _dedupe_by_link(batch)
+    if not rows:
+        return []
+
+    try:
+        archived = (await session.execute(_archived_links_query(list(rows)))).scalars().all()
+        if archived:
+            await session.execute(_restore_statement(properties_archive.c.link.in_(archived)))
+        previous = {row.link: row for row in await session.execute(_tracked_fields_query(list(rows)))}
+        returned = (await session.execute(_upsert_statement(rows))).all()
+        inserted = {row.link: row.inserted for row in returned}
+        changes = _change_rows(rows, previous)
+        if changes:
+            await session.execute(insert(PropertyChange), changes)
+        if returned:
+            searches = (await session.execute(_saved_searches_query())).all()
+            matches = match_rows(searches, rows, returned)
+            if matches:
+                await session.execute(_match_insert(matches))
+        new_items = _new_items(rows, returned)
+        fingerprints, bands = dedupe_batch(new_items)
+        candidates = (await session.execute(candidates_query(bands))).all() if bands else []
+        fp_rows, clusters = assign_clusters(fingerprints, candidates)
+        if fp_rows:
+            await session.execute(fingerprint_insert(fp_rows))
+        clusters += singleton_clusters([pid for pid, _ in new_items], clusters)
+        if clusters:
+            await session.execute(cluster_update(), clusters)
+        unchanged = _unchanged_ids(previous, inserted)
+        if seen_ids is not None:
+            seen_ids.update(unchanged)
+        elif unchanged:
+            await session.execute(_touch_statement(unchanged))
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    return _upsert_statuses(batch, rows, previous, inserted)
+
+def touch_properties(db: Session, ids) -> int:
+    """UPDATE properties SET last_seen = now(), active = true WHERE id = ANY(:ids)"""
+    if not ids:
+        return 0
+    count = db.execute(_touch_statement(ids)).rowcount
+    db.commit()
+    return count
+
+async def touch_properties_async(session: AsyncSession, ids) -> int:
+    """Same as touch_properties, on an AsyncSession (asyncpg)."""
+    if not ids:
+        return 0
+    count = (await session.execute(_touch_statement(ids))).rowcount
+    await session.commit()
+    return count
+
+# Compact "card" representation of the table view: everything but the long texts
+CARD_FIELDS = (
+    "id", "title", "price", "location", "sector", "neighborhood_normalized", "link",
+    "area", "bedrooms", "bathrooms", "source", "image_url", "status",
+    "created_at", "last_seen", "portal_published_date", "latitude", "longitude", "listing_cluster_id",
+)
+# Never returned by the API (internal search column)
+HIDDEN_FIELDS = {"search_text"}
+
+# show_archived: hot and cold rows under the same column names. Postgres flattens the
+# UNION ALL and pushes filters, ORDER BY and LIMIT into both sides (and every partition).
+_ALL_LISTINGS = union_all(
+    select(*Property.__table__.columns),
+    select(*(properties_archive.c[c.name] for c in Property.__table__.columns)),
+).subquery("listings")
+
+def listings_table(show_archived: bool = False):
+    """What list queries read: properties, or properties + properties_archive with show_archived."""
+    return _ALL_LISTINGS if show_archived else Property.__table__
+
+def property_columns(fields: str = None, show_archived: bool = False) -> list:
+    """
+    Columns for a list projection: `fields` is a comma-separated list of column
+    names, "all" for every column, or None for CARD_FIELDS.
+    `id` and `created_at` are always included. Raises ValueError on unknown names.
+    """
+    available = [c for c in listings_table(show_archived).columns if c.name not in HIDDEN_FIELDS]
+    if fields == "all":
+        return available
+    names = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(CARD_FIELDS)
+    by_name = {c.name: c for c in available}
+    unknown = [n for n in names if n not in by_name and n != "days_active"]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # Keyset pagination keys are always returned (next cursor)
+    names = ["id", "created_at"] + names
+    return [by_name[n] for n in dict.fromkeys(names) if n in by_name]
+
+def days_active_column(show_archived: bool = False):
+    """Whole days since the listing was first seen, computed by Postgres."""
+    age = func.now() - listings_table(show_archived).c.created_at
+    return func.coalesce(cast(func.extract("day", age), Integer), 0).label("days_active")
+
+def select_properties(fields: str = None, show_archived: bool = False):
+    """
+    Core SELECT of only the requested columns (+ days_active): no ORM objects, no description by default.
+    Pass the same `show_archived` to filter_properties() and paginate_properties().
+    """
+    return select(*property_columns(fields, show_archived), days_active_column(show_archived))
+
+def filter_properties(
+    query,
+    source: str = None,
+    min_price: float = None,
+    max_price: float = None,
+    min_area: float = None,
+    max_area: float = None,
+    search: str = None,
+    neighborhood: str = None,
+    show_archived: bool = False,
+    near: tuple = None,
+    radius_km: float = 1.0,
+    collapse_duplicates: bool = False,
+):
+    """
+    Filters of GET /properties, shared by every endpoint that lists properties.
+    `query` can be an ORM Query or a Core select() over the properties table; with
+    `show_archived` a select over listings_table(True) (properties_archive included).
+    `near` is a (lat, lon) point: only properties within `radius_km` of it.
+    `collapse_duplicates` keeps one listing (the oldest visible) per cross-portal cluster.
+    """
+    listings = listings_table(show_archived).c
+    conditions = []
+
+    # 0. Status Filter (Default: Hide Archived)
+    if not show_archived:
+        conditions.append(listings.status != 'ARCHIVED')
+
+    # 1. Source Filter
+    if source:
+        conditions.append(listings.source == source)
+    
+    # 2. Price Range Filter
+    if min_price is not None:
+        conditions.append(listings.price >= min_price)
+    if max_price is not None:
+        conditions.append(listings.price <= max_price)
+
+    # 3. Area Range Filter (ignore 0 or nulls if needed, but simple filter for now)
+    if min_area is not None:
+        conditions.append(listings.area >= min_area)
+    if max_area is not None:
+        conditions.append(listings.area <= max_area)
+
+    # 4. Sector Filter (Static Classification)
+    if neighborhood:
+        # The 'neighborhood' parameter now represents the sector name
+        # Filter directly by the static sector field
+        conditions.append(listings.sector == neighborhood)
+
+    # 5. Text Search (Title, Location or Description)
+    # Accent/case-insensitive ("belen" matches "Belén"), served by the trigram index on search_text
+    if search:
+        search_term = func.lower(func.f_unaccent(f"%{search}%"))
+        conditions.append(listings.search_text.like(search_term))
+
+    # 6. Radius Search (approximate coordinates from the offline gazetteer)
+    # Geohash prefixes (B-tree candidates), then the exact haversine distance
+    if near:
+        lat, lon = near
+        prefixes = covering_prefixes(lat, lon, radius_km)
+        conditions.append(or_(*(listings.geohash.startswith(p, autoescape=True) for p in prefixes)))
+        conditions.append(distance_km(lat, lon, show_archived) <= radius_km)
+
+    # 7. Cross-portal Duplicates: hide a listing when an older one of its cluster
+    # passes the same filters (otherwise the unit would vanish from the results)
+    if collapse_duplicates:
+        older = listings_table(show_archived).alias("older")
+        duplicate = select(older.c.id).where(
+            older.c.listing_cluster_id == listings.listing_cluster_id,
+            older.c.id < listings.id,
+            *(ClauseAdapter(older).traverse(condition) for condition in conditions),
+        )
+        conditions.append(~duplicate.exists())
+
+    return query.filter(*conditions) if conditions else query
+
+def distance_km(lat: float, lon: float, show_archived: bool = False):
+    """SQL haversine distance (km) from (lat, lon) to each property."""
+    listings = listings_table(show_archived).c
+    dlat = func.radians(listings.latitude - lat) / 2
+    dlon = func.radians(listings.longitude - lon) / 2
+    a = func.power(func.sin(dlat), 2) + (
+        math.cos(math.radians(lat)) * func.cos(func.radians(listings.latitude)) * func.power(func.sin(dlon), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(a))
+
+# Lower bounds (COP/month) of the price facet buckets; the last one is open-ended
+PRICE_BUCKET_BOUNDS = (0, 1_000_000, 1_500_000, 2_000_000, 2_500_000, 3_000_000, 4_000_000, 5_000_000)
+
+# Facet dimension -> the filter_properties() parameters that filter on it
+FACET_FILTERS = {"source": ("source",), "sector": ("neighborhood",), "price": ("min_price", "max_price")}
+
+def get_property_facets(db: Session, **filters) -> dict:
+    """
+    Result counts per source, sector, price bucket and bedrooms for the
+    filter_properties() filters, in one scan (GROUP BY GROUPING SETS).
+    Each dimension is counted with every filter but its own, so a chosen sector
+    still lists the other sectors (and their counts) to switch to.
+    """
+    listings = listings_table(filters.get("show_archived", False)).c
+    bounds = ",".join(str(b) for b in PRICE_BUCKET_BOUNDS)
+    # Literal array: the same expression text in SELECT and GROUP BY
+    price_bucket = func.width_bucket(listings.price, literal_column(f"ARRAY[{bounds}]::float8[]"))
+    dimensions = {
+        "source": listings.source,
+        "sector": listings.sector,
+        "price": price_bucket,
+        "bedrooms": listings.bedrooms,
+    }
+
+    # Dimension filters become per-count FILTER (WHERE ...) clauses (same conditions as
+    # filter_properties); the rest filter the scan itself
+    own = {name: [] for name in FACET_FILTERS}
+    if filters.get("source"):
+        own["source"].append(listings.source == filters["source"])
+    if filters.get("neighborhood"):
+        own["sector"].append(listings.sector == filters["neighborhood"])
+    if filters.get("min_price") is not None:
+        own["price"].append(listings.price >= filters["min_price"])
+    if filters.get("max_price") is not None:
+        own["price"].append(listings.price <= filters["max_price"])
+
+    def count_without(dimension):
+        conditions = [c for name, cs in own.items() if name != dimension for c in cs]
+        return func.count().filter(and_(*conditions)) if conditions else func.count()
+
+    counts = {name: count_without(name).label(f"count_{name}") for name in own}
+    query = select(
+        *dimensions.values(),
+        func.grouping(*dimensions.values()).label("grouping"),
+        count_without(None).label("count"),
+        *counts.values(),
+    )
+    scan_filters = {k: v for k, v in filters.items() if not any(k in names for names in FACET_FILTERS.values())}
+    query = filter_properties(query, **scan_filters).group_by(
+        func.grouping_sets(*dimensions.values(), text("()"))
+    )
+
+    # grouping() has one bit per dimension (first = highest), 1 = not grouped by it
+    width = len(dimensions)
+    masks = {((1 << width) - 1) ^ (1 << (width - 1 - i)): name for i, name in enumerate(dimensions)}
+    facets = {"total": 0, **{name: {} for name in dimensions}}
+    for row in db.execute(query).mappings():
+        name = masks.get(row["grouping"])
+        if name is None:
+            facets["total"] = row["count"]
+            continue
+        value = row[dimensions[name]]
+        count = row[f"count_{name}"] if name in counts else row["count"]
+        if value is not None and count:
+            facets[name][value] = count
+
+    facets["price"] = [
+        {
+            "min": PRICE_BUCKET_BOUNDS[bucket - 1],
+            "max": PRICE_BUCKET_BOUNDS[bucket] if bucket < len(PRICE_BUCKET_BOUNDS) else None,
+            "count": count,
+        }
+        for bucket, count in sorted(facets["price"].items()) if bucket > 0
+    ]
+    return facets
+
+def encode_cursor(created_at: datetime.datetime, property_id: int) -> str:
+    """Opaque keyset cursor for the (created_at DESC, id DESC) listing order."""
+    payload = json.dumps([created_at.isoformat(), property_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor(); raises ValueError on malformed input."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, property_id = json.loads(payload)
+        return datetime.datetime.fromisoformat(created_at), int(property_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+def paginate_properties(query, cursor: str = None, show_archived: bool = False):
+    """Newest first with `id` as tie-breaker; with a cursor, only rows after it (keyset)."""
+    listings = listings_table(show_archived).c
+    if cursor:
+        created_at, property_id = decode_cursor(cursor)
+        query = query.filter(tuple_(listings.created_at, listings.id) < tuple_(created_at, property_id))
+    return query.order_by(listings.created_at.desc(), listings.id.desc())
+
+def estimate_count(db: Session, query) -> int:
+    """Planner row estimate for `query` (reltuples x selectivity): no COUNT(*) scan."""
+    statement = getattr(query, "statement", query)  # ORM Query or Core Select
+    conn = db.connection()
+    # Bound parameters go to the driver as parameters: user input is never pasted into the SQL
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    [plan] = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params).scalar()
+    return int(plan["Plan"]["Plan Rows"])
+
+def get_property_history(db: Session, property_id: int, limit: int = 100):
+    """Tracked-field changes of one property, newest first."""
+    return db.query(PropertyChange).filter(
+        PropertyChange.property_id == property_id
+    ).order_by(PropertyChange.observed_at.desc()).limit(limit).all()
+
+def get_price_drops(db: Session, hours: int = 24, sector: str = None, limit: int = 100):
+    """
+    Recent price drops (newest first) served by the partial indexes on property_changes.
+    The matching properties are fetched afterwards by primary key.
+    """
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=hours)
+    query = db.query(PropertyChange).filter(
+        PropertyChange.field == "price",
+        PropertyChange.new_value < PropertyChange.old_value,
+        PropertyChange.observed_at >= since,
+    )
+    if sector:
+        query = query.filter(PropertyChange.sector == sector)
+    changes = query.order_by(PropertyChange.observed_at.desc()).limit(limit).all()
+
+    ids = {change.property_id for change in changes}
+    properties = {p.id: p for p in db.query(Property).filter(Property.id.in_(ids))} if ids else {}
+    return [(change, properties.get(change.property_id)) for change in changes]
+
 def archive_stale_properties(db: Session, days: int = 3):
     """
     Mark properties as ARCHIVED if they haven't been seen in the last X days.
@@ -51,3 +578,87 @@ def archive_stale_properties(db: Session, days: int = 3):
     
     db.commit()
     return count
+
+def ensure_archive_partitions(db: Session, timestamps) -> None:
+    """
+    Monthly partitions of properties_archive (last_seen, UTC) covering `timestamps`.
+    Runs in the caller's transaction; existing partitions are skipped without locking the parent.
+    """
+    utc = (t.astimezone(datetime.timezone.utc) for t in timestamps)
+    months = {datetime.date(t.year, t.month, 1) for t in utc}
+    for month in sorted(months):
+        end = (month + datetime.timedelta(days=32)).replace(day=1)
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS properties_archive_{month:%Y_%m} PARTITION OF properties_archive"
+            f" FOR VALUES FROM ('{month:%Y-%m-%d} 00:00+00') TO ('{end:%Y-%m-%d} 00:00+00')"
+        ))
+
+def move_archived_properties(db: Session, days: int = 30, batch_size: int = 1000) -> int:
+    """
+    Move ARCHIVED listings not seen for `days` from properties to properties_archive,
+    `batch_size` rows per transaction (one DELETE ... RETURNING feeding an INSERT ... SELECT).
+    The archive keeps the listing (and its id) as it was last seen; its change
+    history, fingerprint and saved-search matches stay where they are.
+    """
+    threshold = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+    # SKIP LOCKED: rows being written by a scrape are left for the next batch/run
+    batch_query = select(Property.id, Property.last_seen).where(
+        Property.status == 'ARCHIVED', Property.last_seen < threshold
+    ).order_by(Property.last_seen).limit(batch_size).with_for_update(skip_locked=True)
+
+    columns = [c.name for c in Property.__table__.columns]
+    moved = delete(Property).where(
+        Property.id == any_(bindparam("ids", type_=ARRAY(Integer)))
+    ).returning(*Property.__table__.columns).cte("moved")
+    statement = properties_archive.insert().from_select(columns, select(*(moved.c[name] for name in columns)))
+
+    total = 0
+    while True:
+        batch = db.execute(batch_query).all()
+        if not batch:
+            return total
+        # Same transaction as the move: the locked rows cannot change month meanwhile
+        ensure_archive_partitions(db, [row.last_seen for row in batch])
+        total += db.execute(statement, {"ids": [row.id for row in batch]}).rowcount
+        db.commit()
+        if len(batch) < batch_size:
+            return total
+
+def refresh_property_stats(db: Session):
+    """
+    Recompute the property_stats materialized view after bulk writes
+    (scrapes, archive, reclassify). CONCURRENTLY: /stats keeps reading the old rows meanwhile.
+    """
+    db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY property_stats"))
+    db.commit()
+
+def get_property_stats(db: Session, group_by=("source",), include_archived: bool = True):
+    """
+    Property counts by any of source, sector, status and day, summed from the
+    pre-aggregated rows (a few dozen) instead of scanning properties.
+    Returns [(dim1, ..., count), ...].
+    """
+    dimensions = [property_stats.c[name] for name in group_by]
+    total = cast(func.sum(property_stats.c.count), Integer).label("count")
+    query = select(*dimensions, total).group_by(*dimensions)
+    if not include_archived:
+        query = query.where(property_stats.c.status.is_distinct_from("ARCHIVED"))
+    return db.execute(query.order_by(*dimensions)).all()
+
+def get_new_matches(db: Session, search_id: int, limit: int = 100):
+    """Unseen inbox of a saved search, newest match first: [(match, property)]."""
+    return db.query(SavedSearchMatch, Property).join(
+        Property, Property.id == SavedSearchMatch.property_id
+    ).filter(
+        SavedSearchMatch.saved_search_id == search_id,
+        SavedSearchMatch.seen_at.is_(None),
+    ).order_by(SavedSearchMatch.matched_at.desc()).limit(limit).all()
+
+def mark_matches_seen(db: Session, search_id: int) -> int:
+    """Empty the inbox of a saved search."""
+    count = db.query(SavedSearchMatch).filter(
+        SavedSearchMatch.saved_search_id == search_id,
+        SavedSearchMatch.seen_at.is_(None),
+    ).update({SavedSearchMatch.seen_at: func.now()}, synchronize_session=False)
+    db.commit()
+    return count
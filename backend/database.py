@@ -1,5 +1,8 @@
+import asyncio
 import os
+import weakref
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -10,6 +13,7 @@ POSTGRES_HOST = os.getenv("POSTGRES_HOST", "db")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 
 DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -22,3 +26,24 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# asyncpg connections belong to the event loop that opened them, so each loop
+# (Celery's run_async, asyncio.run in the CLIs) gets its own async engine/pool.
+_async_engines = weakref.WeakKeyDictionary()
+
+def get_async_engine() -> AsyncEngine:
+    loop = asyncio.get_running_loop()
+    async_engine = _async_engines.get(loop)
+    if async_engine is None:
+        async_engine = _async_engines[loop] = create_async_engine(ASYNC_DATABASE_URL, pool_pre_ping=True)
+    return async_engine
+
+def AsyncSessionLocal():
+    """New AsyncSession on the current loop's engine (one per unit of work, never shared)."""
+    return async_sessionmaker(get_async_engine(), expire_on_commit=False)()
+
+async def dispose_async_engine():
+    """Close the current loop's pool before the loop itself is closed."""
+    async_engine = _async_engines.pop(asyncio.get_running_loop(), None)
+    if async_engine is not None:
+        await async_engine.dispose()
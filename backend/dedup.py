@@ -0,0 +1,236 @@
+"""
+Cross-portal duplicate detection (MinHash + LSH).
+
+The same apartment is often published by several agencies. Every new listing
+gets a MinHash signature over its normalized title words plus overlapping
+area and price-band tokens (two listings of the same unit share most of them
+even when the titles are written differently). The signature is cut into LSH
+bands; each band key also embeds sector and bedrooms, so only listings of the
+same block can collide. Band keys are stored in listing_fingerprints.bands
+(GIN index): finding the candidates of a listing is one `bands && :keys`
+lookup instead of a comparison with every stored row.
+
+Candidates from another portal whose estimated similarity and price/area
+agree are duplicates: the new listing joins their listing_cluster_id (the id
+of the first listing of the cluster; a cluster never holds two listings of the
+same portal). Otherwise it starts its own cluster.
+
+Usage (existing rows without a fingerprint):
+    python dedup.py
+"""
+import argparse
+import hashlib
+import logging
+import math
+import random
+import re
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import BigInteger, bindparam, func, select, true
+from sqlalchemy.dialects.postgresql import ARRAY, array, insert
+
+from models import ListingFingerprint, Property
+from saved_searches import fold
+
+logger = logging.getLogger("Dedup")
+
+NUM_PERM = 30
+BANDS = 10
+ROWS = NUM_PERM // BANDS
+# Estimated Jaccard similarity required on top of the price/area checks
+MIN_SIMILARITY = 0.4
+MAX_PRICE_DIFF = 0.10
+MAX_AREA_DIFF = 0.08
+# Candidates kept per band key (oldest first): bounded work per listing even
+# for very common listings ("Apartamento en Belén", same price)
+MAX_BUCKET = 50
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240501)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOP_WORDS = {
+    "en", "de", "la", "el", "los", "las", "del", "y", "a", "para", "con", "se", "por",
+    "arriendo", "arrienda", "renta", "venta", "vende", "medellin", "antioquia",
+}
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+def _signed64(value: int) -> int:
+    # bigint columns are signed
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def features(data: dict) -> set:
+    """Title words plus area/price tokens at several widths and offsets."""
+    tokens = {f"w:{w}" for w in _WORD_RE.findall(fold(data.get("title"))) if w not in _STOP_WORDS}
+    area = data.get("area")
+    if area:
+        for width in (2, 5, 10):
+            tokens.add(f"a{width}:{math.floor(area / width)}")
+            tokens.add(f"a{width}+:{math.floor(area / width + 0.5)}")
+    price = data.get("price")
+    if price and price > 0:
+        # Relative bands: log scale, so 3% means 3% at any price
+        for width in (0.03, 0.07, 0.15):
+            position = math.log(price) / math.log1p(width)
+            tokens.add(f"p{width}:{math.floor(position)}")
+            tokens.add(f"p{width}+:{math.floor(position + 0.5)}")
+    return tokens
+
+def minhash(tokens: set) -> List[int]:
+    hashes = [_hash64(t) for t in tokens]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+def band_keys(signature: List[int], sector: Optional[str], bedrooms: Optional[int]) -> List[int]:
+    block = f"{sector or ''}|{bedrooms if bedrooms is not None else ''}"
+    return [
+        _signed64(_hash64(f"{block}|{i}|{','.join(map(str, signature[i * ROWS:(i + 1) * ROWS]))}"))
+        for i in range(BANDS)
+    ]
+
+def similarity(a: List[int], b: List[int]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+def _close(a: Optional[float], b: Optional[float], tolerance: float) -> Optional[bool]:
+    if not a or not b:
+        return None
+    return abs(a - b) <= tolerance * max(a, b)
+
+
+class Fingerprint(NamedTuple):
+    property_id: int
+    signature: list
+    bands: list
+    source: Optional[str]
+    price: Optional[float]
+    area: Optional[float]
+    cluster_id: Optional[int] = None
+
+def fingerprint(property_id: int, data: dict) -> Optional[Fingerprint]:
+    """None when there is nothing to compare (no price and no area)."""
+    if not data.get("price") and not data.get("area"):
+        return None
+    signature = [_signed64(v) for v in minhash(features(data))]
+    return Fingerprint(
+        property_id, signature, band_keys(signature, data.get("sector"), data.get("bedrooms")),
+        data.get("source"), data.get("price"), data.get("area"),
+    )
+
+def is_duplicate(a: Fingerprint, b: Fingerprint) -> bool:
+    # Cross-portal only: one agency listing two identical units is not a duplicate
+    if a.source == b.source:
+        return False
+    checks = [_close(a.price, b.price, MAX_PRICE_DIFF), _close(a.area, b.area, MAX_AREA_DIFF)]
+    if False in checks or checks == [None, None]:
+        return False
+    return similarity(a.signature, b.signature) >= MIN_SIMILARITY
+
+def candidates_query(bands: list):
+    """
+    Stored fingerprints sharing at least one band key: the oldest MAX_BUCKET of
+    each key (LATERAL over the keys, GIN index on bands), so one crowded key
+    cannot crowd out the candidates of the others.
+    """
+    band = func.unnest(bindparam("bands", bands, type_=ARRAY(BigInteger))).table_valued("key").render_derived(name="band")
+    stored = ListingFingerprint.__table__.alias("stored")
+    bucket = select(stored.c.property_id).where(
+        stored.c.bands.overlap(array([band.c.key], type_=BigInteger))
+    ).order_by(stored.c.property_id).limit(MAX_BUCKET).lateral("bucket")
+    ids = select(bucket.c.property_id).select_from(band).join(bucket, true())
+    return select(
+        ListingFingerprint.property_id, ListingFingerprint.signature, ListingFingerprint.bands,
+        Property.source, Property.price, Property.area, Property.listing_cluster_id.label("cluster_id"),
+    ).join(Property, Property.id == ListingFingerprint.property_id).where(
+        ListingFingerprint.property_id.in_(ids)
+    ).order_by(ListingFingerprint.property_id)
+
+def assign_clusters(fingerprints: List[Fingerprint], candidates) -> tuple:
+    """
+    Cluster of each new fingerprint, from the stored candidates and the
+    fingerprints before it in the same batch.
+    Returns (listing_fingerprints rows, [{"pid": id, "cid": cluster_id}]).
+    """
+    by_band = {}
+
+    def index(fp: Fingerprint):
+        for key in fp.bands:
+            bucket = by_band.setdefault(key, [])
+            if len(bucket) < MAX_BUCKET:
+                bucket.append(fp)
+
+    for row in candidates:
+        index(Fingerprint(row.property_id, row.signature, row.bands, row.source,
+                          row.price, row.area, row.cluster_id or row.property_id))
+
+    rows, clusters = [], []
+    for fp in fingerprints:
+        pool = {c.property_id: c for key in fp.bands for c in by_band.get(key, [])}
+        pool.pop(fp.property_id, None)
+        # A cluster is one unit: never two listings of the same portal in it
+        taken = {c.cluster_id for c in pool.values() if c.source == fp.source}
+        matches = [c.cluster_id for c in pool.values() if c.cluster_id not in taken and is_duplicate(fp, c)]
+        cluster_id = min(matches) if matches else fp.property_id
+        index(fp._replace(cluster_id=cluster_id))
+        rows.append({"property_id": fp.property_id, "signature": fp.signature, "bands": fp.bands})
+        clusters.append({"pid": fp.property_id, "cid": cluster_id})
+    return rows, clusters
+
+def singleton_clusters(ids: list, clusters: list) -> list:
+    """Listings left out of `clusters` (nothing to compare) are their own cluster."""
+    assigned = {c["pid"] for c in clusters}
+    return [{"pid": pid, "cid": pid} for pid in ids if pid not in assigned]
+
+def fingerprint_insert(rows: list):
+    return insert(ListingFingerprint).values(rows).on_conflict_do_nothing()
+
+def cluster_update():
+    """executemany with [{"pid": ..., "cid": ...}]."""
+    table = Property.__table__
+    return table.update().where(table.c.id == bindparam("pid")).values(listing_cluster_id=bindparam("cid"))
+
+def dedupe_batch(new_items: list) -> tuple:
+    """[(property_id, data)] -> (fingerprints, all their band keys)."""
+    fingerprints = [fp for fp in (fingerprint(pid, data) for pid, data in new_items) if fp]
+    bands = sorted({key for fp in fingerprints for key in fp.bands})
+    return fingerprints, bands
+
+def backfill(chunk_size: int = 1000) -> int:
+    """Fingerprint and cluster the stored listings that have no fingerprint yet, oldest first."""
+    from database import SessionLocal
+
+    db = SessionLocal()
+    done = 0
+    try:
+        while True:
+            rows = db.execute(
+                select(Property.id, Property.title, Property.price, Property.area, Property.bedrooms,
+                       Property.sector, Property.source)
+                .outerjoin(ListingFingerprint, ListingFingerprint.property_id == Property.id)
+                .where(ListingFingerprint.property_id.is_(None), Property.listing_cluster_id.is_(None))
+                .order_by(Property.id).limit(chunk_size)
+            ).mappings().all()
+            if not rows:
+                break
+            fingerprints, bands = dedupe_batch([(r["id"], dict(r)) for r in rows])
+            candidates = db.execute(candidates_query(bands)).all() if bands else []
+            fp_rows, clusters = assign_clusters(fingerprints, candidates)
+            # Rows with nothing to compare still leave the queue as their own cluster
+            clusters += singleton_clusters([r["id"] for r in rows], clusters)
+            if fp_rows:
+                db.execute(fingerprint_insert(fp_rows))
+            db.execute(cluster_update(), clusters)
+            db.commit()
+            done += len(rows)
+            logger.info(f"Fingerprinted {done} listings")
+    finally:
+        db.close()
+    return done
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Fingerprint and cluster stored listings (cross-portal duplicates)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Listings per transaction")
+    args = parser.parse_args()
+    backfill(chunk_size=args.chunk_size)
@@ -0,0 +1,118 @@
+"""
+Offline geo helpers: neighborhood centroids, geohash and haversine distance.
+
+No PostGIS and no online geocoder: coordinates come from the static gazetteer
+neighborhood_centroids.json (approximate centroid per map variant, with the
+sector centroid as fallback). Radius search narrows candidates with a B-tree
+lookup on geohash prefixes (the 3x3 block of cells around the point) and then
+applies the exact haversine distance.
+"""
+import json
+import math
+import os
+import threading
+from typing import List, Optional, Tuple
+
+CENTROIDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "neighborhood_centroids.json")
+
+EARTH_RADIUS_KM = 6371.0
+GEOHASH_PRECISION = 9  # ~5 m cells, stored; searches use shorter prefixes
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def geohash_encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """(height, width) of a cell in degrees."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def covering_prefixes(lat: float, lon: float, radius_km: float) -> List[str]:
+    """
+    Geohash prefixes whose cells cover the circle: the longest precision whose
+    cell is at least `radius_km` on each side, and the 3x3 block around the point.
+    """
+    km_per_degree = math.pi * EARTH_RADIUS_KM / 180
+    precision = 1
+    for p in range(GEOHASH_PRECISION, 0, -1):
+        height, width = geohash_cell_size(p)
+        if min(height * km_per_degree, width * km_per_degree * math.cos(math.radians(lat))) >= radius_km:
+            precision = p
+            break
+    height, width = geohash_cell_size(precision)
+    prefixes = {
+        geohash_encode(max(-90.0, min(90.0, lat + dy * height)), ((lon + dx * width + 180) % 360) - 180, precision)
+        for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+    }
+    return sorted(prefixes)
+
+def parse_point(text: str) -> Tuple[float, float]:
+    """"lat,lon" -> (lat, lon); raises ValueError."""
+    try:
+        lat, lon = (float(part) for part in text.split(","))
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError(f"Invalid point {text!r}, expected 'lat,lon'")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f"Point out of range: {text!r}")
+    return lat, lon
+
+
+class Gazetteer:
+    """Centroid lookup by (sector, variant) from neighborhood_centroids.json."""
+
+    def __init__(self, path: str = CENTROIDS_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.sectors = {sector: entry.get("centroid") for sector, entry in data.items()}
+        self.variants = {
+            (sector, variant): point
+            for sector, entry in data.items()
+            for variant, point in entry.get("variants", {}).items()
+        }
+
+    def centroid(self, sector: Optional[str], variant: Optional[str] = None) -> Optional[Tuple[float, float]]:
+        point = self.variants.get((sector, variant)) or self.sectors.get(sector)
+        return tuple(point) if point else None
+
+    def locate(self, sector: Optional[str], variant: Optional[str] = None) -> dict:
+        """Property columns (latitude, longitude, geohash); empty when the place is unknown."""
+        point = self.centroid(sector, variant)
+        if not point:
+            return {}
+        lat, lon = point
+        return {"latitude": lat, "longitude": lon, "geohash": geohash_encode(lat, lon)}
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+def get_gazetteer() -> Gazetteer:
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer()
+    return _gazetteer
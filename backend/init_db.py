@@ -1,10 +1,15 @@
-from database import engine, Base
-from models import Property
+import os
+
+from alembic import command
+from alembic.config import Config
 
 def init_db():
-    print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
-    print("Tables created successfully.")
+    # The schema is managed by Alembic (migrations/); this is `alembic upgrade head`
+    print("Applying database migrations...")
+    config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations"))
+    command.upgrade(config, "head")
+    print("Database is up to date.")
 
 if __name__ == "__main__":
     init_db()
@@ -1,5 +1,5 @@
 from database import engine, Base
-from models import Property, SavedSearch
+from models import Property, PropertyChange, ListingFingerprint, SavedSearch, SavedSearchMatch, NeighborhoodVariant, DiscoveredNeighborhood, NeighborhoodMapVersion, properties_archive
 
 def init():
     print("Iniciando creación de tablas...")
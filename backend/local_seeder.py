@@ -2,7 +2,8 @@ import asyncio
 import logging
 import argparse
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import SessionLocal, dispose_async_engine
+from tasks import refresh_stats
 from scrapers.albertoalvarez import AlbertoAlvarezScraper
 from scrapers.ayura import AyuraScraper
 from scrapers.santafe import SantaFeScraper
@@ -53,12 +54,14 @@ async def seed_portal(portal_name: str, max_pages: int, headless: bool):
 
     try:
         await scraper.init_browser(headless=headless)
-        await scraper.scrape()
+        await scraper.run()
         logger.info(f"Seeding completed for {portal_name}")
+        refresh_stats(db)
     except Exception as e:
         logger.error(f"Critical error in seeder: {e}")
     finally:
         await scraper.close_browser()
+        await dispose_async_engine()
         db.close()
 
 import requests
@@ -1,17 +1,24 @@
-from fastapi import FastAPI, Depends, HTTPException, Body, Request
+from fastapi import FastAPI, Depends, HTTPException, Body, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 from typing import List, Optional
 from pydantic import BaseModel
+import csv
+import io
 import json
 
 from database import engine, Base, get_db
-from models import Property, SavedSearch
-from tasks import scrape_portal_task
+from models import Property, SavedSearch, DiscoveredNeighborhood
+from tasks import scrape_portal_task, schedule_stats_refresh
+from core.cache import cached, bump_data_generation, etag
+from geo import parse_point
+from crud import (
+    filter_properties, paginate_properties, encode_cursor, estimate_count, listings_table, select_properties,
+)
 
 limiter = Limiter(key_func=get_remote_address)
 app = FastAPI(title="Medellín Real Estate Monitor")
@@ -44,6 +51,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination metadata of GET /properties
+    expose_headers=["X-Next-Cursor", "X-Total-Estimate", "ETag"],
 )
 
 # API Key Security
@@ -66,10 +75,70 @@ async def get_api_key(header_value: str = Security(api_key_header)):
 def read_root():
     return {"status": "ok", "message": "Medellín Real Estate Monitor API is running"}
 
+def _not_modified(request: Request, response: Response, namespace: str, params: dict) -> Optional[Response]:
+    """
+    Set the ETag of the response; when the client already has that version return
+    a 304 to send instead (no query, no serialization).
+    """
+    tag = etag(namespace, params)
+    if tag is None:
+        return None
+    # Browsers revalidate on every fetch and turn the 304 back into their cached 200
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    if tag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def _parse_near(near: Optional[str]) -> Optional[tuple]:
+    """near=lat,lon: properties within radius_km (approximate neighborhood centroids)."""
+    try:
+        return parse_point(near) if near else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _load_properties(
+    db: Session, skip: int, limit: int, cursor: Optional[str], fields: Optional[str], **filters
+) -> dict:
+    """One page of GET /properties: {"items": [...], "headers": {...}} (cacheable as a whole)."""
+    # Compact card projection by default (no description); `fields=a,b,c` or `fields=all` to choose.
+    # days_active is computed by Postgres, rows come back as plain mappings (no ORM objects).
+    # show_archived also reads properties_archive (listings moved out of the hot table)
+    show_archived = filters.get("show_archived", False)
+    try:
+        query = select_properties(fields, show_archived)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    query = filter_properties(query, **filters)
+    headers = {}
+
+    # First page: planner estimate of the filtered total (no COUNT(*) per filter change)
+    if not cursor:
+        headers["X-Total-Estimate"] = str(estimate_count(db, query))
+
+    # Newest first, keyset pagination on (created_at, id).
+    # `cursor` comes from the X-Next-Cursor header of the previous page; `skip` is kept for old clients.
+    try:
+        query = paginate_properties(query, cursor, show_archived)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not cursor and skip:
+        query = query.offset(skip)
+    properties = db.execute(query.limit(limit)).mappings().all()
+
+    if properties and len(properties) == limit and properties[-1]["created_at"] is not None:
+        headers["X-Next-Cursor"] = encode_cursor(properties[-1]["created_at"], properties[-1]["id"])
+
+    return {"items": [dict(p) for p in properties], "headers": headers}
+
 @app.get("/properties")
 def get_properties(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 500, 
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     source: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
@@ -78,120 +147,205 @@ def get_properties(
     search: Optional[str] = None,
     neighborhood: Optional[str] = None,
     show_archived: bool = False,
+    near: Optional[str] = None,
+    radius_km: float = Query(1.0, gt=0, le=50),
+    collapse_duplicates: bool = False,
     db: Session = Depends(get_db)
 ):
-    query = db.query(Property)
-    
-    # 0. Status Filter (Default: Hide Archived)
-    if not show_archived:
-        query = query.filter(Property.status != 'ARCHIVED')
+    point = _parse_near(near)
+    params = dict(
+        skip=skip, limit=limit, cursor=cursor, fields=fields,
+        source=source, min_price=min_price, max_price=max_price,
+        min_area=min_area, max_area=max_area, search=search,
+        neighborhood=neighborhood, show_archived=show_archived,
+        near=point, radius_km=radius_km if point else None,
+        collapse_duplicates=collapse_duplicates,
+    )
+    not_modified = _not_modified(request, response, "properties", params)
+    if not_modified:
+        return not_modified
+    # Cached until the next scrape/status change bumps the data generation
+    page = cached("properties", params, lambda: _load_properties(db, **params))
+    response.headers.update(page["headers"])
+    return page["items"]
 
-    # 1. Source Filter
-    if source:
-        query = query.filter(Property.source == source)
-    
-    # 2. Price Range Filter
-    if min_price is not None:
-        query = query.filter(Property.price >= min_price)
-    if max_price is not None:
-        query = query.filter(Property.price <= max_price)
-
-    # 3. Area Range Filter (ignore 0 or nulls if needed, but simple filter for now)
-    if min_area is not None:
-        query = query.filter(Property.area >= min_area)
-    if max_area is not None:
-        query = query.filter(Property.area <= max_area)
-
-    # 4. Sector Filter (Static Classification)
-    if neighborhood:
-        # The 'neighborhood' parameter now represents the sector name
-        # Filter directly by the static sector field
-        query = query.filter(Property.sector == neighborhood)
-
-    # 5. Text Search (Title or Location)
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                Property.title.ilike(search_term),
-                Property.location.ilike(search_term),
-                Property.description.ilike(search_term)
-            )
-        )
-    
-    # Order by status logic (NEW first), then date
-    # Ideally: NEW/SEEN -> Date
-    properties = query.order_by(Property.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # Enrich with days_active and neighborhood_normalized
-    from datetime import datetime, timezone
-    from neighborhood_utils import auto_resolve_neighborhood, resolve_specific_variant
-    
-    # Load map once per request (or optimize to global)
-    nb_map = {}
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+def _export_rows(query, export_format: str, chunk_size: int = 2000):
+    """Encode `query` chunk by chunk from a server-side cursor: memory stays constant with the row count."""
+    # Own connection: the request's Session is closed before a streamed body is sent
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        columns = list(result.keys())
+        if export_format == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(columns)
+            yield buf.getvalue()
+            for partition in result.partitions():
+                buf.seek(0)
+                buf.truncate(0)
+                writer.writerows(partition)
+                yield buf.getvalue()
+        else:
+            for partition in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) + "\n"
+                    for row in partition
+                )
+
+@app.get("/properties/export")
+def export_properties(
+    export_format: str = Query("ndjson", alias="format"),
+    fields: Optional[str] = "all",
+    source: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_area: Optional[float] = None,
+    max_area: Optional[float] = None,
+    search: Optional[str] = None,
+    neighborhood: Optional[str] = None,
+    show_archived: bool = False,
+    near: Optional[str] = None,
+    radius_km: float = Query(1.0, gt=0, le=50),
+    collapse_duplicates: bool = False,
+):
+    """Every property matching the /properties filters, streamed as NDJSON or CSV."""
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    point = _parse_near(near)
     try:
-        with open("neighborhood_map.json", "r", encoding="utf-8") as f:
-            nb_map = json.load(f)
-    except:
-        pass
+        query = select_properties(fields, show_archived)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    query = filter_properties(
+        query,
+        source=source, min_price=min_price, max_price=max_price,
+        min_area=min_area, max_area=max_area, search=search,
+        neighborhood=neighborhood, show_archived=show_archived,
+        near=point, radius_km=radius_km, collapse_duplicates=collapse_duplicates,
+    ).order_by(listings_table(show_archived).c.id)
+
+    return StreamingResponse(
+        _export_rows(query, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="properties.{export_format}"'},
+    )
+
+@app.get("/properties/facets")
+def get_property_facets(
+    request: Request,
+    response: Response,
+    source: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_area: Optional[float] = None,
+    max_area: Optional[float] = None,
+    search: Optional[str] = None,
+    neighborhood: Optional[str] = None,
+    show_archived: bool = False,
+    near: Optional[str] = None,
+    radius_km: float = Query(1.0, gt=0, le=50),
+    collapse_duplicates: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Counts per source, sector, price bucket and bedrooms for the /properties filters (FiltersBar)."""
+    from crud import get_property_facets as load_facets
+
+    point = _parse_near(near)
+    filters = dict(
+        source=source, min_price=min_price, max_price=max_price,
+        min_area=min_area, max_area=max_area, search=search,
+        neighborhood=neighborhood, show_archived=show_archived,
+        near=point, radius_km=radius_km if point else None,
+        collapse_duplicates=collapse_duplicates,
+    )
+    not_modified = _not_modified(request, response, "facets", filters)
+    if not_modified:
+        return not_modified
+    return cached("facets", filters, lambda: load_facets(db, **filters))
+
+@app.get("/properties/price-drops")
+def get_recent_price_drops(
+    hours: int = 24,
+    neighborhood: Optional[str] = None,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """Price drops observed in the last `hours`, optionally for one sector."""
+    from crud import get_price_drops
 
-    now = datetime.now(timezone.utc)
-    
     results = []
-    for p in properties:
-        p_dict = {c.name: getattr(p, c.name) for c in p.__table__.columns}
-        
-        # Computed fields
-        created_at = p.created_at
-        if created_at.tzinfo is None:
-             created_at = created_at.replace(tzinfo=timezone.utc)
-             
-        p_dict['days_active'] = (now - created_at).days if created_at else 0
-        
-        # Normalize Neighborhood (Specific Name)
-        raw_loc = (p.location or "").strip()
-        # Try finding the specific nice variant
-        specific_name = resolve_specific_variant(raw_loc, nb_map)
-        
-        # Fallback: if resolve fails, try using title? Or stick to None (let frontend show original)
-        if not specific_name:
-             specific_name = resolve_specific_variant(p.title or "", nb_map)
-
-        p_dict['neighborhood_normalized'] = specific_name
-        
-        results.append(p_dict)
-        
+    for change, prop in get_price_drops(db, hours=hours, sector=neighborhood, limit=limit):
+        results.append({
+            "property_id": change.property_id,
+            "title": prop.title if prop else None,
+            "link": prop.link if prop else None,
+            "source": prop.source if prop else None,
+            "sector": change.sector,
+            "old_price": change.old_value,
+            "new_price": change.new_value,
+            "observed_at": change.observed_at,
+        })
     return results
 
+@app.get("/properties/{property_id}/history")
+def get_property_history(property_id: int, limit: int = 100, db: Session = Depends(get_db)):
+    """Price and metadata changes of one property, newest first."""
+    from crud import get_property_history as load_history
+
+    return [
+        {"field": c.field, "old": c.old_value, "new": c.new_value, "observed_at": c.observed_at}
+        for c in load_history(db, property_id, limit=limit)
+    ]
+
+@app.get("/properties/{property_id}")
+def get_property(property_id: int, db: Session = Depends(get_db)):
+    """Full representation of one property, including its description (also once moved to the archive)."""
+    query = select_properties("all", show_archived=True).where(listings_table(True).c.id == property_id)
+    prop = db.execute(query).mappings().first()
+    if not prop:
+        raise HTTPException(status_code=404, detail="Property not found")
+    return dict(prop)
+
 @app.get("/neighborhoods")
-def get_neighborhoods(db: Session = Depends(get_db)):
+def get_neighborhoods(request: Request, response: Response, counts: bool = False, db: Session = Depends(get_db)):
     """
-    Returns distinct sectors from the database.
-    This replaces the old neighborhood map approach with static sector classification.
+    Returns the sector catalog, served from the in-memory neighborhood map (no table scan).
+    With counts=true each sector maps to its number of non-archived properties
+    (from property_stats) instead of an empty list.
     """
-    from sqlalchemy import func, distinct
-    
-    # Get all distinct sectors, excluding None and "Sin Clasificar" for cleaner UI
-    sectors = db.query(distinct(Property.sector)).filter(
-        Property.sector.isnot(None),
-        Property.sector != "Sin Clasificar"
-    ).order_by(Property.sector).all()
-    
-    # Convert to simple list and add "Sin Clasificar" at the end
-    sector_list = [s[0] for s in sectors if s[0]]
-    sector_list.append("Sin Clasificar")
-    
-    # Return as dict for compatibility with frontend (expects object with keys)
-    return {sector: [] for sector in sector_list}
+    from crud import get_property_stats
+    from neighborhood_store import get_neighborhood_index
+    from neighborhood_utils import UNCLASSIFIED_SECTOR
+
+    index = get_neighborhood_index()
+    # "Sin Clasificar" at the end for cleaner UI
+    sectors = sorted(s for s in index.nb_map if s != UNCLASSIFIED_SECTOR) + [UNCLASSIFIED_SECTOR]
+
+    # Changes with the map version and (through the ETag/cache key) the data generation
+    params = {"map_version": index.version, "counts": counts}
+    not_modified = _not_modified(request, response, "neighborhoods", params)
+    if not_modified:
+        return not_modified
+    if not counts:
+        # Return as dict for compatibility with frontend (expects object with keys)
+        return {sector: [] for sector in sectors}
+
+    def load():
+        active = dict(get_property_stats(db, group_by=("sector",), include_archived=False))
+        return {sector: active.get(sector, 0) for sector in sectors}
+
+    return cached("neighborhoods", params, load)
 
 @app.get("/neighborhoods/discovered")
-def get_discovered_neighborhoods():
+def get_discovered_neighborhoods(db: Session = Depends(get_db)):
     """Retorna la lista de barrios descubiertos por los scrapers."""
-    try:
-        with open("discovered_neighborhoods.json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return []
+    rows = db.query(DiscoveredNeighborhood.name).order_by(DiscoveredNeighborhood.name).all()
+    return [name for (name,) in rows]
 
 @app.put("/properties/{property_id}/status")
 def update_property_status(
@@ -200,36 +354,55 @@ def update_property_status(
     db: Session = Depends(get_db),
     api_key: str = Depends(get_api_key)
 ):
-    prop = db.query(Property).filter(Property.id == property_id).first()
-    if not prop:
-        raise HTTPException(status_code=404, detail="Property not found")
-    
+    from crud import restore_archived_property
+
     # Valid statuses
     valid_statuses = ["NEW", "SEEN", "ARCHIVED", "FAVORITE"]
     if status_update.status not in valid_statuses:
         raise HTTPException(status_code=400, detail="Invalid status")
 
+    prop = db.query(Property).filter(Property.id == property_id).first()
+    if not prop and restore_archived_property(db, property_id):
+        # Listed from properties_archive (show_archived): statuses are edited in the hot table
+        prop = db.query(Property).filter(Property.id == property_id).first()
+    if not prop:
+        raise HTTPException(status_code=404, detail="Property not found")
+
     prop.status = status_update.status
     db.commit()
+    bump_data_generation()
+    schedule_stats_refresh()
     return {"id": prop.id, "status": prop.status}
 
 # --- SAVED SEARCHES ---
 
 @app.get("/stats")
-def get_stats(db: Session = Depends(get_db)):
+def get_stats(request: Request, response: Response, db: Session = Depends(get_db)):
     """
-    Returns total property counts grouped by source.
+    Returns live (non-archived) property counts grouped by source, and counts by
+    status. by_status["ARCHIVED"] only counts the archived listings still in the
+    hot table (not yet moved to properties_archive).
     """
-    from sqlalchemy import func
-    results = db.query(Property.source, func.count(Property.id)).group_by(Property.source).all()
-    
-    total = sum(count for source, count in results)
-    by_source = {source: count for source, count in results if source}
-    
-    return {
-        "total": total,
-        "by_source": by_source
-    }
+    from crud import get_property_stats
+
+    def load():
+        # Pre-aggregated rows of property_stats (refreshed after every scrape), not a full-table GROUP BY
+        results = get_property_stats(db, group_by=("source",), include_archived=False)
+
+        total = sum(count for source, count in results)
+        by_source = {source: count for source, count in results if source}
+        by_status = {status: count for status, count in get_property_stats(db, group_by=("status",)) if status}
+
+        return {
+            "total": total,
+            "by_source": by_source,
+            "by_status": by_status,
+        }
+
+    not_modified = _not_modified(request, response, "stats", {})
+    if not_modified:
+        return not_modified
+    return cached("stats", {}, load)
 
 @app.get("/saved_searches", response_model=List[SavedSearchOut])
 def get_searches(db: Session = Depends(get_db)):
@@ -244,12 +417,42 @@ def get_searches(db: Session = Depends(get_db)):
         results.append(SavedSearchOut(id=s.id, name=s.name, criteria=criteria_dict))
     return results
 
+@app.get("/saved_searches/{search_id}/new")
+def get_new_search_matches(search_id: int, limit: int = 100, db: Session = Depends(get_db)):
+    """Listings that matched the saved search at ingest and were not acknowledged yet."""
+    from crud import CARD_FIELDS, get_new_matches
+
+    if not db.query(SavedSearch.id).filter(SavedSearch.id == search_id).first():
+        raise HTTPException(status_code=404, detail="Search not found")
+    return [
+        {**{field: getattr(prop, field) for field in CARD_FIELDS}, "matched_at": match.matched_at}
+        for match, prop in get_new_matches(db, search_id, limit=limit)
+    ]
+
+@app.post("/saved_searches/{search_id}/seen")
+def mark_search_matches_seen(
+    search_id: int,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(get_api_key)
+):
+    """Empty the new-matches inbox of a saved search."""
+    from crud import mark_matches_seen
+
+    return {"seen": mark_matches_seen(db, search_id)}
+
 @app.post("/searches")
 def create_search(
     search: SavedSearchCreate, 
     db: Session = Depends(get_db),
     api_key: str = Depends(get_api_key)
 ):
+    from saved_searches import compile_criteria
+
+    # Matched against every ingest batch: reject criteria that cannot be compiled
+    try:
+        compile_criteria(search.criteria)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     criteria_json = json.dumps(search.criteria)
     db_search = SavedSearch(name=search.name, criteria=criteria_json)
     db.add(db_search)
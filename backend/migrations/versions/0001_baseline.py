@@ -0,0 +1,120 @@
+"""Baseline: schema previously created with Base.metadata.create_all()
+
+Every step is conditional so existing databases (created by init_db.py /
+create_all) and empty ones end up at the same revision.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_table(inspector, name, *columns, **kw):
+    if not inspector.has_table(name):
+        op.create_table(name, *columns, **kw)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    _create_table(
+        inspector, "properties",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("price", sa.Float(), nullable=True),
+        sa.Column("location", sa.String(), nullable=True),
+        sa.Column("sector", sa.String(), nullable=True),
+        sa.Column("neighborhood_normalized", sa.String(), nullable=True),
+        sa.Column("link", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("area", sa.Float(), nullable=True),
+        sa.Column("bedrooms", sa.Integer(), nullable=True),
+        sa.Column("bathrooms", sa.Integer(), nullable=True),
+        sa.Column("source", sa.String(), nullable=True),
+        sa.Column("external_id", sa.String(), nullable=True),
+        sa.Column("image_url", sa.String(), nullable=True),
+        sa.Column("active", sa.Boolean(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_seen", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("portal_published_date", sa.DateTime(timezone=True), nullable=True),
+    )
+    # Columns added after the first deployments (formerly added ad hoc by reclassify.py)
+    op.execute("ALTER TABLE properties ADD COLUMN IF NOT EXISTS sector VARCHAR")
+    op.execute("ALTER TABLE properties ADD COLUMN IF NOT EXISTS neighborhood_normalized VARCHAR")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_properties_id ON properties (id)")
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_properties_link ON properties (link)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_properties_sector ON properties (sector)")
+
+    _create_table(
+        inspector, "saved_searches",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("criteria", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_saved_searches_id ON saved_searches (id)")
+
+    _create_table(
+        inspector, "neighborhood_variants",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("sector", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("auto_mapped", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.UniqueConstraint("sector", "name", name="uq_neighborhood_variant"),
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_neighborhood_variants_id ON neighborhood_variants (id)")
+
+    _create_table(
+        inspector, "discovered_neighborhoods",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("clean_name", sa.String(), nullable=False, unique=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_discovered_neighborhoods_id ON discovered_neighborhoods (id)")
+
+    _create_table(
+        inspector, "neighborhood_map_versions",
+        sa.Column("version", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("reason", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+
+    _create_table(
+        inspector, "property_changes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("property_id", sa.Integer(), sa.ForeignKey("properties.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("field", sa.String(), nullable=False),
+        sa.Column("old_value", sa.Float(), nullable=True),
+        sa.Column("new_value", sa.Float(), nullable=True),
+        sa.Column("sector", sa.String(), nullable=True),
+        sa.Column("observed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_property_changes_property_observed"
+        " ON property_changes (property_id, observed_at)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_property_changes_price_drops_sector ON property_changes (sector, observed_at)"
+        " WHERE field = 'price' AND new_value < old_value"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_property_changes_price_drops ON property_changes (observed_at)"
+        " WHERE field = 'price' AND new_value < old_value"
+    )
+
+
+def downgrade():
+    for table in ("property_changes", "neighborhood_map_versions", "discovered_neighborhoods",
+                  "neighborhood_variants", "saved_searches", "properties"):
+        op.drop_table(table)
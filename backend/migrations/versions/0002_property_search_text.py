@@ -0,0 +1,44 @@
+"""Accent-insensitive trigram search over title, location and description
+
+properties.search_text is a STORED generated column (maintained by Postgres on
+every write) holding the unaccented, lower-cased text, with a GIN trigram index
+so that `search_text LIKE '%belen%'` no longer scans the table.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Both extensions are "trusted": the database owner can create them
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # unaccent() is only STABLE; generated columns and index expressions need IMMUTABLE
+    op.execute(
+        "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text"
+        " LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT"
+        " AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+    )
+    op.execute(
+        "ALTER TABLE properties ADD COLUMN IF NOT EXISTS search_text TEXT"
+        " GENERATED ALWAYS AS (lower(f_unaccent("
+        "coalesce(title, '') || ' ' || coalesce(location, '') || ' ' || coalesce(description, '')"
+        "))) STORED"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_properties_search_text_trgm"
+        " ON properties USING gin (search_text gin_trgm_ops)"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_properties_search_text_trgm")
+    op.execute("ALTER TABLE properties DROP COLUMN IF EXISTS search_text")
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
@@ -0,0 +1,42 @@
+"""Partial/composite indexes for the /properties listing and the stale cleanup
+
+- (created_at DESC, id DESC) WHERE status <> 'ARCHIVED': default listing order
+- (source, created_at DESC) / (sector, created_at DESC) with the same predicate:
+  listing filtered by portal or by sector
+- (last_seen) WHERE status <> 'ARCHIVED': archive_stale_properties()
+
+Built CONCURRENTLY so the scrapers can keep writing while they are created.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_properties_visible_created": "(created_at DESC, id DESC)",
+    "ix_properties_visible_source_created": "(source, created_at DESC)",
+    "ix_properties_visible_sector_created": "(sector, created_at DESC)",
+    "ix_properties_visible_last_seen": "(last_seen)",
+}
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON properties {columns}"
+                " WHERE status <> 'ARCHIVED'"
+            )
+        op.execute("ANALYZE properties")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
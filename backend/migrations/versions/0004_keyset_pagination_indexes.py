@@ -0,0 +1,42 @@
+"""Keyset pagination: (created_at DESC, id DESC) ordering for the filtered listings
+
+/properties now orders by (created_at, id) so that cursors are stable. The
+by-source and by-sector indexes from 0003 get `id DESC` as a last key
+(otherwise ties on created_at need an incremental sort). New indexes are
+built before the old ones are dropped.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+REPLACED = {
+    "ix_properties_visible_source_created": ("ix_properties_visible_source_keyset", "source"),
+    "ix_properties_visible_sector_created": ("ix_properties_visible_sector_keyset", "sector"),
+}
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for old_name, (new_name, column) in REPLACED.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {new_name}"
+                f" ON properties ({column}, created_at DESC, id DESC) WHERE status <> 'ARCHIVED'"
+            )
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {old_name}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for old_name, (new_name, column) in REPLACED.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {old_name}"
+                f" ON properties ({column}, created_at DESC) WHERE status <> 'ARCHIVED'"
+            )
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {new_name}")
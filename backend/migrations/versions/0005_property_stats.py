@@ -0,0 +1,36 @@
+"""Pre-aggregated property counts (materialized view property_stats)
+
+/stats used to run a GROUP BY over the whole properties table on every call.
+property_stats holds one row per (source, sector, status, day) and is refreshed
+CONCURRENTLY (readers are never blocked) at the end of every scrape, archive and
+reclassify run. The unique index is required by REFRESH ... CONCURRENTLY;
+NULLS NOT DISTINCT because source/sector can be NULL.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "CREATE MATERIALIZED VIEW IF NOT EXISTS property_stats AS"
+        " SELECT source, sector, status,"
+        " (created_at AT TIME ZONE 'America/Bogota')::date AS day,"
+        " count(*) AS count"
+        " FROM properties GROUP BY 1, 2, 3, 4"
+    )
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_property_stats_key"
+        " ON property_stats (source, sector, status, day) NULLS NOT DISTINCT"
+    )
+
+
+def downgrade():
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS property_stats")
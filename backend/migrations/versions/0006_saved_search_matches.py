@@ -0,0 +1,41 @@
+"""Saved-search inbox: saved_search_matches
+
+Listings that match a saved search are recorded at ingest time, so
+GET /saved_searches/{id}/new reads a handful of rows instead of replaying the
+search over the whole properties table. A listing matches a search once
+(primary key); seen_at is set when the client acknowledges the inbox.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_all() (init_tables.py, tests) may have created it already
+    if not sa.inspect(op.get_bind()).has_table("saved_search_matches"):
+        op.create_table(
+            "saved_search_matches",
+            sa.Column("saved_search_id", sa.Integer(),
+                      sa.ForeignKey("saved_searches.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("property_id", sa.Integer(),
+                      sa.ForeignKey("properties.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("matched_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            sa.Column("seen_at", sa.DateTime(timezone=True), nullable=True),
+        )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_saved_search_matches_unseen"
+        " ON saved_search_matches (saved_search_id, matched_at) WHERE seen_at IS NULL"
+    )
+
+
+def downgrade():
+    op.drop_index("ix_saved_search_matches_unseen", table_name="saved_search_matches")
+    op.drop_table("saved_search_matches")
@@ -0,0 +1,64 @@
+"""Approximate coordinates and geohash for radius search
+
+properties gets latitude/longitude (centroid of its neighborhood variant, or
+of its sector, from the offline gazetteer neighborhood_centroids.json) and a
+geohash with a varchar_pattern_ops B-tree, so `geohash LIKE 'd3472%'` prefix
+lookups narrow `near=lat,lon` searches before the exact haversine filter.
+Existing rows are backfilled from their sector/neighborhood_normalized before
+the index is built.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+from geo import Gazetteer
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE properties ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION")
+    op.execute("ALTER TABLE properties ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION")
+    op.execute("ALTER TABLE properties ADD COLUMN IF NOT EXISTS geohash VARCHAR(12)")
+
+    gazetteer = Gazetteer()
+    bind = op.get_bind()
+    # Variant centroids first, then the sector centroid for whatever is left
+    by_variant = [
+        {"sector": sector, "variant": variant, **gazetteer.locate(sector, variant)}
+        for sector, variant in gazetteer.variants
+    ]
+    if by_variant:
+        bind.execute(sa.text(
+            "UPDATE properties SET latitude = :latitude, longitude = :longitude, geohash = :geohash"
+            " WHERE sector = :sector AND neighborhood_normalized = :variant"
+        ), by_variant)
+    by_sector = [
+        {"sector": sector, **gazetteer.locate(sector)}
+        for sector, point in gazetteer.sectors.items() if point
+    ]
+    if by_sector:
+        bind.execute(sa.text(
+            "UPDATE properties SET latitude = :latitude, longitude = :longitude, geohash = :geohash"
+            " WHERE sector = :sector AND geohash IS NULL"
+        ), by_sector)
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_properties_geohash"
+            " ON properties (geohash varchar_pattern_ops)"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_properties_geohash")
+    op.execute("ALTER TABLE properties DROP COLUMN IF EXISTS geohash")
+    op.execute("ALTER TABLE properties DROP COLUMN IF EXISTS longitude")
+    op.execute("ALTER TABLE properties DROP COLUMN IF EXISTS latitude")
@@ -0,0 +1,49 @@
+"""Cross-portal duplicate clusters: listing_fingerprints and listing_cluster_id
+
+listing_fingerprints keeps the MinHash signature and LSH band keys of every
+listing (dedup.py), with a GIN index on the band keys for candidate lookup.
+properties.listing_cluster_id groups the listings of the same unit across
+portals; (listing_cluster_id, id) serves collapse_duplicates on /properties.
+Existing rows are fingerprinted afterwards with `python dedup.py`.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE properties ADD COLUMN IF NOT EXISTS listing_cluster_id INTEGER")
+    # create_all() (init_tables.py, tests) may have created it already
+    if not sa.inspect(op.get_bind()).has_table("listing_fingerprints"):
+        op.create_table(
+            "listing_fingerprints",
+            sa.Column("property_id", sa.Integer(),
+                      sa.ForeignKey("properties.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("signature", postgresql.ARRAY(sa.BigInteger()), nullable=False),
+            sa.Column("bands", postgresql.ARRAY(sa.BigInteger()), nullable=False),
+        )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_listing_fingerprints_bands"
+        " ON listing_fingerprints USING gin (bands)"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_properties_cluster"
+            " ON properties (listing_cluster_id, id)"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_properties_cluster")
+    op.drop_table("listing_fingerprints")
+    op.execute("ALTER TABLE properties DROP COLUMN IF EXISTS listing_cluster_id")
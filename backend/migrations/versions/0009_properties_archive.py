@@ -0,0 +1,95 @@
+"""Hot/cold split: properties_archive, range-partitioned by month of last_seen
+
+Archived listings used to stay in properties forever: every default query had
+to skip them and the table kept growing with every scrape. Listings archived
+and not seen for a while are now moved (crud.move_archived_properties) to
+properties_archive, which has the same columns plus archived_at and one
+partition per month of last_seen (created on demand by the move).
+GET /properties?show_archived=true reads properties UNION ALL properties_archive.
+
+Also:
+- (last_seen) WHERE status = 'ARCHIVED': rows waiting to be moved
+- saved_search_matches (property_id): the ON DELETE CASCADE of a move would
+  otherwise scan the whole inbox table for every moved listing
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_all() (init_tables.py, tests) may have created it already
+    if not sa.inspect(op.get_bind()).has_table("properties_archive"):
+        op.create_table(
+            "properties_archive",
+            sa.Column("id", sa.Integer(), nullable=False, autoincrement=False),
+            sa.Column("title", sa.String(), nullable=True),
+            sa.Column("price", sa.Float(), nullable=True),
+            sa.Column("location", sa.String(), nullable=True),
+            sa.Column("sector", sa.String(), nullable=True),
+            sa.Column("neighborhood_normalized", sa.String(), nullable=True),
+            sa.Column("link", sa.String(), nullable=False),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("area", sa.Float(), nullable=True),
+            sa.Column("bedrooms", sa.Integer(), nullable=True),
+            sa.Column("bathrooms", sa.Integer(), nullable=True),
+            sa.Column("source", sa.String(), nullable=True),
+            sa.Column("external_id", sa.String(), nullable=True),
+            sa.Column("image_url", sa.String(), nullable=True),
+            sa.Column("active", sa.Boolean(), nullable=True),
+            sa.Column("status", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("last_seen", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("portal_published_date", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("latitude", sa.Float(), nullable=True),
+            sa.Column("longitude", sa.Float(), nullable=True),
+            sa.Column("geohash", sa.String(12), nullable=True),
+            sa.Column("listing_cluster_id", sa.Integer(), nullable=True),
+            sa.Column("search_text", sa.Text(), nullable=True),
+            sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            sa.PrimaryKeyConstraint("id", "last_seen"),
+            postgresql_partition_by="RANGE (last_seen)",
+        )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_properties_archive_created"
+        " ON properties_archive (created_at DESC, id DESC)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_saved_search_matches_property"
+        " ON saved_search_matches (property_id)"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_properties_archived_last_seen"
+            " ON properties (last_seen) WHERE status = 'ARCHIVED'"
+        )
+
+
+def downgrade():
+    # Moved listings go back to the hot table first
+    op.execute(
+        "INSERT INTO properties ("
+        "id, title, price, location, sector, neighborhood_normalized, link, description,"
+        " area, bedrooms, bathrooms, source, external_id, image_url, active, status,"
+        " created_at, updated_at, last_seen, portal_published_date,"
+        " latitude, longitude, geohash, listing_cluster_id)"
+        " SELECT id, title, price, location, sector, neighborhood_normalized, link, description,"
+        " area, bedrooms, bathrooms, source, external_id, image_url, active, status,"
+        " created_at, updated_at, last_seen, portal_published_date,"
+        " latitude, longitude, geohash, listing_cluster_id"
+        " FROM properties_archive ON CONFLICT DO NOTHING"
+    )
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_properties_archived_last_seen")
+    op.execute("DROP INDEX IF EXISTS ix_saved_search_matches_property")
+    # Drops every partition with it
+    op.drop_table("properties_archive")
@@ -0,0 +1,46 @@
+"""Moved listings keep their history and can come back
+
+Moving a listing to properties_archive is a DELETE from properties, and the
+ON DELETE CASCADE of property_changes, listing_fingerprints and
+saved_search_matches wiped its price history, fingerprint and inbox entries.
+Those rows are keyed by the listing id, which the archive keeps, so the FKs
+are dropped (the listing may be in either table). The saved_search_matches
+(property_id) index only served the cascade.
+
+Also properties_archive (link): a listing seen again by a scrape, or whose status is
+edited from the show_archived view, is moved back to properties.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+TABLES = ("property_changes", "listing_fingerprints", "saved_search_matches")
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table in TABLES:
+        for fk in inspector.get_foreign_keys(table):
+            if fk["referred_table"] == "properties":
+                op.drop_constraint(fk["name"], table, type_="foreignkey")
+    op.execute("DROP INDEX IF EXISTS ix_saved_search_matches_property")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_properties_archive_link ON properties_archive (link)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_properties_archive_link")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_saved_search_matches_property ON saved_search_matches (property_id)")
+    for table in TABLES:
+        # Rows of listings that are only in the archive cannot satisfy the FK
+        op.execute(f"DELETE FROM {table} t WHERE NOT EXISTS (SELECT 1 FROM properties p WHERE p.id = t.property_id)")
+        op.create_foreign_key(
+            f"{table}_property_id_fkey", table, "properties", ["property_id"], ["id"], ondelete="CASCADE"
+        )
@@ -1,17 +1,29 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Boolean, UniqueConstraint
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Float, Text, Boolean, UniqueConstraint, ForeignKey, Index, Table, text, Computed, DDL, event
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import deferred
+from sqlalchemy.sql import column, func, table
 from database import Base
 
+# Accent-insensitive search (migrations/versions/0002_property_search_text.py)
+SEARCH_TEXT_EXPRESSION = (
+    "lower(f_unaccent(coalesce(title, '') || ' ' || coalesce(location, '') || ' ' || coalesce(description, '')))"
+)
+
 class Property(Base):
     __tablename__ = "properties"
+    __table_args__ = (
+        Index("ix_properties_search_text_trgm", "search_text",
+              postgresql_using="gin", postgresql_ops={"search_text": "gin_trgm_ops"}),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=True)
     price = Column(Float, nullable=True) # Using Float for flexibility, or BigInteger
     location = Column(String, nullable=True)
     sector = Column(String, nullable=True, index=True)  # Static sector classification
+    neighborhood_normalized = Column(String, nullable=True)  # Specific variant name (UI display)
     link = Column(String, unique=True, index=True, nullable=False)
-    description = Column(Text, nullable=True)
+    description = deferred(Column(Text, nullable=True))  # Long text: only loaded by the detail view
     
     # New fields
     area = Column(Float, nullable=True)
@@ -34,9 +46,123 @@ class Property(Base):
     # New V4 field: Date published on the external portal (if available)
     portal_published_date = Column(DateTime(timezone=True), nullable=True)
 
+    # Approximate position from the offline gazetteer (geo.py), by sector/variant centroid
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    geohash = Column(String(12), nullable=True)
+
+    # Cross-portal duplicates share it: id of the first listing of the cluster (dedup.py)
+    listing_cluster_id = Column(Integer, nullable=True)
+
+    # Maintained by Postgres on every write; only used for filtering (never loaded by default)
+    search_text = deferred(Column(Text, Computed(SEARCH_TEXT_EXPRESSION, persisted=True)))
+
     def __repr__(self):
         return f"<Property(id={self.id}, title={self.title}, price={self.price}, status={self.status})>"
 
+# Listing indexes (migrations/versions/0003_listing_indexes.py, 0004_keyset_pagination_indexes.py).
+# The default /properties query hides archived rows and sorts by (created_at, id) newest first.
+_NOT_ARCHIVED = text("status <> 'ARCHIVED'")
+Index("ix_properties_visible_created", Property.created_at.desc(), Property.id.desc(), postgresql_where=_NOT_ARCHIVED)
+Index("ix_properties_visible_source_keyset", Property.source, Property.created_at.desc(), Property.id.desc(),
+      postgresql_where=_NOT_ARCHIVED)
+Index("ix_properties_visible_sector_keyset", Property.sector, Property.created_at.desc(), Property.id.desc(),
+      postgresql_where=_NOT_ARCHIVED)
+# archive_stale_properties(): last_seen < threshold AND status != 'ARCHIVED'
+Index("ix_properties_visible_last_seen", Property.last_seen, postgresql_where=_NOT_ARCHIVED)
+# Radius search: geohash LIKE 'prefix%' candidates (migrations/versions/0007_property_geohash.py)
+Index("ix_properties_geohash", Property.geohash, postgresql_ops={"geohash": "varchar_pattern_ops"})
+# collapse_duplicates: "is there an older listing in my cluster?" (0008_listing_clusters.py)
+Index("ix_properties_cluster", Property.listing_cluster_id, Property.id)
+
+# create_all() on an empty database (tests, init_db.py) needs the same helpers as the migration
+event.listen(Property.__table__, "before_create", DDL(
+    "CREATE EXTENSION IF NOT EXISTS unaccent;"
+    " CREATE EXTENSION IF NOT EXISTS pg_trgm;"
+    " CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text"
+    " LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT"
+    " AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+))
+
+# Pre-aggregated counts (migrations/versions/0005_property_stats.py), refreshed by
+# crud.refresh_property_stats(). A materialized view, so it is not part of Base.metadata.
+property_stats = table(
+    "property_stats",
+    column("source", String),
+    column("sector", String),
+    column("status", String),
+    column("day", Date),
+    column("count", Integer),
+)
+
+event.listen(Property.__table__, "after_create", DDL(
+    "CREATE MATERIALIZED VIEW IF NOT EXISTS property_stats AS"
+    " SELECT source, sector, status,"
+    " (created_at AT TIME ZONE 'America/Bogota')::date AS day,"
+    " count(*) AS count"
+    " FROM properties GROUP BY 1, 2, 3, 4;"
+    " CREATE UNIQUE INDEX IF NOT EXISTS ux_property_stats_key"
+    " ON property_stats (source, sector, status, day) NULLS NOT DISTINCT"
+))
+event.listen(Property.__table__, "before_drop", DDL("DROP MATERIALIZED VIEW IF EXISTS property_stats"))
+
+# Cold tier (migrations/versions/0009_properties_archive.py): archived listings not seen
+# for a while are moved here by crud.move_archived_properties(), so the hot table only
+# holds the live working set. Same columns as properties (search_text is stored as it
+# was when moved), range-partitioned by month of last_seen; partitions are created on
+# demand by crud.ensure_archive_partitions().
+properties_archive = Table(
+    "properties_archive", Base.metadata,
+    *(
+        Column(c.name, c.type, primary_key=c.name in ("id", "last_seen"), autoincrement=False,
+               nullable=c.name not in ("id", "last_seen", "link"))
+        for c in Property.__table__.columns
+    ),
+    Column("archived_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+    postgresql_partition_by="RANGE (last_seen)",
+)
+# show_archived listing order (created_at DESC, id DESC), per partition
+Index("ix_properties_archive_created", properties_archive.c.created_at.desc(), properties_archive.c.id.desc())
+# Relisted links are moved back at ingest (crud._restore_statement)
+Index("ix_properties_archive_link", properties_archive.c.link)
+# move_archived_properties(): status = 'ARCHIVED' AND last_seen < threshold
+Index("ix_properties_archived_last_seen", Property.last_seen, postgresql_where=text("status = 'ARCHIVED'"))
+
+class PropertyChange(Base):
+    """Append-only history of tracked fields (price, area, bedrooms, bathrooms)."""
+    __tablename__ = "property_changes"
+    __table_args__ = (
+        # Per-property history, newest first
+        Index("ix_property_changes_property_observed", "property_id", "observed_at"),
+        # "Price drops in the last N hours" (optionally by sector) without touching properties
+        Index("ix_property_changes_price_drops_sector", "sector", "observed_at",
+              postgresql_where=text("field = 'price' AND new_value < old_value")),
+        Index("ix_property_changes_price_drops", "observed_at",
+              postgresql_where=text("field = 'price' AND new_value < old_value")),
+    )
+
+    id = Column(Integer, primary_key=True)
+    # properties.id or properties_archive.id: no FK, the history outlives the move to the archive
+    property_id = Column(Integer, nullable=False)
+    field = Column(String, nullable=False)
+    old_value = Column(Float, nullable=True)
+    new_value = Column(Float, nullable=True)
+    sector = Column(String, nullable=True)  # Copied from the property when observed
+    observed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class ListingFingerprint(Base):
+    """MinHash signature and LSH band keys of a listing (dedup.py)."""
+    __tablename__ = "listing_fingerprints"
+    __table_args__ = (
+        # Candidate lookup: bands && :keys
+        Index("ix_listing_fingerprints_bands", "bands", postgresql_using="gin"),
+    )
+
+    # No FK: kept while the listing sits in properties_archive (it may be moved back)
+    property_id = Column(Integer, primary_key=True)
+    signature = Column(ARRAY(BigInteger), nullable=False)
+    bands = Column(ARRAY(BigInteger), nullable=False)
+
 class SavedSearch(Base):
     __tablename__ = "saved_searches"
 
@@ -45,3 +171,43 @@ class SavedSearch(Base):
     criteria = Column(Text, nullable=False) # JSON string with filters
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+class SavedSearchMatch(Base):
+    """New or changed listings that matched a saved search at ingest (saved_searches.py)."""
+    __tablename__ = "saved_search_matches"
+    __table_args__ = (
+        # Unseen matches of one search, newest first
+        Index("ix_saved_search_matches_unseen", "saved_search_id", "matched_at", postgresql_where=text("seen_at IS NULL")),
+    )
+
+    saved_search_id = Column(Integer, ForeignKey("saved_searches.id", ondelete="CASCADE"), primary_key=True)
+    # No FK: kept while the listing sits in properties_archive (it may be moved back)
+    property_id = Column(Integer, primary_key=True)
+    matched_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    seen_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class NeighborhoodVariant(Base):
+    __tablename__ = "neighborhood_variants"
+    __table_args__ = (UniqueConstraint("sector", "name", name="uq_neighborhood_variant"),)
+
+    id = Column(Integer, primary_key=True, index=True)  # Insertion order = map order
+    sector = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    auto_mapped = Column(Boolean, default=False)  # Added by scrapers/sync, not by hand
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class DiscoveredNeighborhood(Base):
+    __tablename__ = "discovered_neighborhoods"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    clean_name = Column(String, unique=True, nullable=False)  # clean_neighborhood_name(name)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class NeighborhoodMapVersion(Base):
+    __tablename__ = "neighborhood_map_versions"
+
+    # One row per map change; the current version is max(version)
+    version = Column(Integer, primary_key=True, autoincrement=True)
+    reason = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
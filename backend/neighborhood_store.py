@@ -0,0 +1,231 @@
+"""
+Persistencia del mapa de barrios en la BD.
+
+Tablas `neighborhood_variants` y `discovered_neighborhoods` con una versión
+monótona (`neighborhood_map_versions`). Cada proceso mantiene un único
+índice en memoria y solo lo reconstruye cuando llega por Redis un mensaje
+anunciando una versión nueva.
+
+`neighborhood_map.json` / `discovered_neighborhoods.json` quedan como semilla
+(importada automáticamente si las tablas están vacías) y como exportación
+versionable en git (ver sync_neighborhoods.py).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import NeighborhoodVariant, DiscoveredNeighborhood, NeighborhoodMapVersion
+from neighborhood_utils import NeighborhoodIndex, NEIGHBORHOOD_MAP_PATH, clean_neighborhood_name
+
+logger = logging.getLogger(__name__)
+
+DISCOVERED_NEIGHBORHOODS_PATH = os.path.join(os.path.dirname(NEIGHBORHOOD_MAP_PATH), "discovered_neighborhoods.json")
+
+# Canal de Redis donde se anuncia cada nueva versión del mapa
+MAP_VERSION_CHANNEL = "neighborhood_map:version"
+
+# Clave del advisory lock usado al sembrar las tablas desde los JSON
+_SEED_LOCK_KEY = 4242001
+
+def current_version(db: Session) -> int:
+    return db.query(func.coalesce(func.max(NeighborhoodMapVersion.version), 0)).scalar()
+
+def load_map(db: Session) -> Tuple[dict, int]:
+    """Devuelve ({sector: [variantes]}, versión) respetando el orden de inserción."""
+    nb_map = {}
+    rows = db.query(NeighborhoodVariant.sector, NeighborhoodVariant.name).order_by(NeighborhoodVariant.id)
+    for sector, name in rows:
+        nb_map.setdefault(sector, []).append(name)
+    return nb_map, current_version(db)
+
+def bump_version(db: Session, reason: str) -> int:
+    """Registra un cambio del mapa (en la transacción actual) y devuelve la nueva versión."""
+    row = NeighborhoodMapVersion(reason=reason)
+    db.add(row)
+    db.flush()
+    return row.version
+
+def publish_map_version(version: int):
+    """Anuncia la nueva versión; si Redis falla, los procesos se ponen al día al reconectar."""
+    try:
+        from core.redis_client import get_redis
+        get_redis().publish(MAP_VERSION_CHANNEL, version)
+    except Exception as e:
+        logger.warning(f"Could not publish neighborhood map version {version}: {e}")
+
+def add_variants(db: Session, pairs: Iterable[Tuple[str, str]], reason: str = "auto-map", auto_mapped: bool = True) -> int:
+    """
+    Upsert atómico de (sector, variante). Si se insertó algo, sube la versión
+    del mapa en la misma transacción y la publica tras el commit.
+    """
+    values = [{"sector": sector, "name": name, "auto_mapped": auto_mapped} for sector, name in pairs]
+    if not values:
+        return 0
+
+    stmt = insert(NeighborhoodVariant).values(values).on_conflict_do_nothing(
+        constraint="uq_neighborhood_variant"
+    ).returning(NeighborhoodVariant.id)
+    inserted = len(db.execute(stmt).fetchall())
+
+    version = bump_version(db, reason) if inserted else None
+    db.commit()
+    if version:
+        publish_map_version(version)
+    return inserted
+
+def add_discoveries(db: Session, names: Iterable[str]) -> int:
+    """Registra barrios desconocidos para revisión manual (deduplicados por nombre limpio)."""
+    values = {}
+    for name in names:
+        clean_name = clean_neighborhood_name(name)
+        if clean_name:
+            values.setdefault(clean_name, {"name": name, "clean_name": clean_name})
+    if not values:
+        return 0
+
+    stmt = insert(DiscoveredNeighborhood).values(list(values.values())).on_conflict_do_nothing(
+        index_elements=["clean_name"]
+    ).returning(DiscoveredNeighborhood.id)
+    inserted = len(db.execute(stmt).fetchall())
+    db.commit()
+    return inserted
+
+def import_map_json(db: Session, path: str = NEIGHBORHOOD_MAP_PATH, replace: bool = False) -> int:
+    """
+    Importa el mapa curado a mano. Con `replace=True` la tabla queda igual al
+    JSON (se borran las variantes que ya no están en el archivo).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        nb_map = json.load(f)
+
+    pairs = [(sector, name) for sector, variants in nb_map.items() for name in variants]
+    changed = 0
+    if replace:
+        wanted = set(pairs)
+        for row in db.query(NeighborhoodVariant).all():
+            if (row.sector, row.name) not in wanted:
+                db.delete(row)
+                changed += 1
+        db.flush()
+
+    version = bump_version(db, "import-json") if changed else None
+    # add_variants hace commit (y sube y publica la versión si insertó algo)
+    changed += add_variants(db, pairs, reason="import-json", auto_mapped=False)
+    db.commit()
+    if version:
+        # Solo hubo borrados (o además inserciones): los procesos deben recargar igual
+        publish_map_version(version)
+    return changed
+
+def export_map_json(db: Session, path: str = NEIGHBORHOOD_MAP_PATH, discovered_path: str = DISCOVERED_NEIGHBORHOODS_PATH):
+    """Escribe el estado de la BD en los JSON versionados (reemplazo atómico)."""
+    nb_map, _ = load_map(db)
+    discovered = [name for (name,) in db.query(DiscoveredNeighborhood.name).order_by(DiscoveredNeighborhood.id)]
+    for target, payload, indent in ((path, nb_map, 4), (discovered_path, discovered, 2)):
+        tmp_path = f"{target}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=indent, ensure_ascii=False)
+        os.replace(tmp_path, target)
+
+def seed_from_files(db: Session):
+    """Primer arranque: copia los JSON a la BD si la tabla de variantes está vacía."""
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _SEED_LOCK_KEY})
+    if db.query(NeighborhoodVariant.id).first() is not None:
+        db.commit()
+        return
+
+    logger.info("Seeding neighborhood tables from JSON files")
+    import_map_json(db, NEIGHBORHOOD_MAP_PATH)
+    if os.path.exists(DISCOVERED_NEIGHBORHOODS_PATH):
+        with open(DISCOVERED_NEIGHBORHOODS_PATH, "r", encoding="utf-8") as f:
+            add_discoveries(db, json.load(f))
+
+
+class DatabaseNeighborhoodIndex(NeighborhoodIndex):
+    """
+    Índice respaldado por la BD. No consulta nada por llamada: `reload()` solo
+    se ejecuta al crearse y cuando se anuncia una versión mayor a la cargada.
+    """
+
+    versioned_by_content = False
+
+    def __init__(self):
+        super().__init__(path=None, nb_map={})
+        self._state = self._state[:4] + (0,) + self._state[5:]
+        self.reload()
+
+    def refresh(self):
+        # Invalidation is push-based (see _listen_for_versions)
+        return
+
+    def reload(self):
+        """Recarga el mapa desde la BD (o desde el JSON si la BD no está disponible)."""
+        db = SessionLocal()
+        try:
+            nb_map, version = load_map(db)
+            if not nb_map:
+                seed_from_files(db)
+                nb_map, version = load_map(db)
+        except Exception as e:
+            logger.warning(f"Could not load neighborhood map from DB, using {NEIGHBORHOOD_MAP_PATH}: {e}")
+            db.rollback()
+            if not self._state[0]:
+                with open(NEIGHBORHOOD_MAP_PATH, "r", encoding="utf-8") as f:
+                    self._state = self._build(json.load(f), 0)
+            return
+        finally:
+            db.close()
+
+        with self._lock:
+            self._state = self._build(nb_map, version)
+
+    def reload_if_newer(self, version: Optional[int]):
+        if version is None or version > (self._state[4] or 0):
+            self.reload()
+
+
+def _listen_for_versions(index: DatabaseNeighborhoodIndex):
+    """Hilo en segundo plano: reconstruye el índice al recibir una versión nueva."""
+    from core.redis_client import get_redis
+
+    while True:
+        try:
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(MAP_VERSION_CHANNEL)
+            # Ponerse al día con lo publicado mientras no estábamos suscritos
+            db = SessionLocal()
+            try:
+                index.reload_if_newer(current_version(db))
+            finally:
+                db.close()
+            for message in pubsub.listen():
+                index.reload_if_newer(int(message["data"]))
+        except Exception as e:
+            logger.warning(f"Neighborhood map listener error, retrying: {e}")
+            time.sleep(5)
+
+
+_shared_index: Optional[DatabaseNeighborhoodIndex] = None
+_shared_pid: Optional[int] = None
+_shared_lock = threading.Lock()
+
+def get_neighborhood_index() -> DatabaseNeighborhoodIndex:
+    """Índice compartido por el proceso (API, scrapers y scripts de mantenimiento)."""
+    global _shared_index, _shared_pid
+    # Tras un fork (Celery prefork, ProcessPool) el hilo listener no sobrevive
+    if _shared_index is None or _shared_pid != os.getpid():
+        with _shared_lock:
+            if _shared_index is None or _shared_pid != os.getpid():
+                index = DatabaseNeighborhoodIndex()
+                threading.Thread(target=_listen_for_versions, args=(index,), daemon=True,
+                                 name="neighborhood-map-listener").start()
+                _shared_index, _shared_pid = index, os.getpid()
+    return _shared_index
@@ -1,49 +1,342 @@
 import unicodedata
 import re
-from typing import Optional
+import os
+import json
+import hashlib
+import heapq
+import threading
+import time
+from typing import List, Optional, Tuple
+
+# Ruta canónica del mapa (independiente del directorio de trabajo)
+NEIGHBORHOOD_MAP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "neighborhood_map.json")
+
+# Sector asignado cuando ninguna variante coincide
+UNCLASSIFIED_SECTOR = "Sin Clasificar"
+
+# Lista de palabras a ignorar por ser demasiado genéricas
+IGNORE_KEYWORDS = {"la", "el", "los", "las", "del", "sur", "norte", "oriente", "occidente"}
+
+# Ruidos comunes precompilados en una sola expresión
+_NOISE_RE = re.compile(
+    r'\b(?:barrio|sector|ubicacion|medellin|municipio|ciudad|comuna|antioquia)\b'
+)
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9\s]')
+_SPACES_RE = re.compile(r'\s+')
 
 def clean_neighborhood_name(name: str) -> str:
     """
-    Normaliza el nombre de un barrio eliminando ruidos comunes, 
+    Normaliza el nombre de un barrio eliminando ruidos comunes,
     acentos y caracteres especiales.
     Ej: "Barrio Belén, Medellín" -> "belen"
     """
     if not name:
         return ""
-    
+
     # 1. Pasar a minúsculas
     name = name.lower()
-    
+
     # 2. Eliminar acentos
     name = unicodedata.normalize('NFD', name).encode('ascii', 'ignore').decode("utf-8")
-    
+
     # 3. Eliminar ruidos comunes
-    ruidos = [
-        r'\bbarrio\b', r'\bsector\b', r'\bubicacion\b', r'\bmedellin\b', 
-        r'\bmunicipio\b', r'\bciudad\b', r'\bcomuna\b', r'\bantioquia\b'
-    ]
-    for ruido in ruidos:
-        name = re.sub(ruido, '', name)
-    
+    name = _NOISE_RE.sub('', name)
+
     # 4. Limpiar caracteres especiales y espacios múltiples
-    name = re.sub(r'[^a-z0-9\s]', ' ', name)
-    name = re.sub(r'\s+', ' ', name).strip()
-    
+    name = _NON_ALNUM_RE.sub(' ', name)
+    name = _SPACES_RE.sub(' ', name).strip()
+
     return name
 
+
+def trigrams(clean_name: str) -> set:
+    """
+    Trigramas al estilo pg_trgm: cada palabra se rellena con dos espacios
+    al inicio y uno al final. Ej: "prado" -> {"  p", " pr", "pra", "rad", "ado", "do "}
+    """
+    grams = set()
+    for word in clean_name.split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class TrigramIndex:
+    """
+    Índice invertido trigrama -> variantes para sugerencias difusas.
+    Solo se puntúan las variantes que comparten al menos un trigrama con la
+    consulta (similitud de Jaccard, igual que `similarity()` de pg_trgm).
+    """
+
+    def __init__(self, variants: List[Tuple[str, str, str]]):
+        # variants: [(nombre limpio, variante, sector)]
+        self.items = []
+        self.sizes = []
+        self.postings = {}
+        for clean_v, v, category in variants:
+            grams = trigrams(clean_v)
+            if not grams:
+                continue
+            idx = len(self.items)
+            self.items.append((v, category))
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(idx)
+
+    def suggest(self, text: str, k: int = 5, min_score: float = 0.0) -> List[Tuple[str, str, float]]:
+        """Top-k [(variante, sector, similitud)] para un nombre sucio."""
+        grams = trigrams(clean_neighborhood_name(text))
+        if not grams:
+            return []
+
+        shared = {}
+        for gram in grams:
+            for idx in self.postings.get(gram, ()):
+                shared[idx] = shared.get(idx, 0) + 1
+
+        n_grams = len(grams)
+        scored = (
+            (common / (n_grams + self.sizes[idx] - common), idx)
+            for idx, common in shared.items()
+        )
+        return [
+            (self.items[idx][0], self.items[idx][1], round(score, 3))
+            for score, idx in heapq.nlargest(k, scored)
+            if score >= min_score
+        ]
+
+
+class NeighborhoodIndex:
+    """
+    Índice precompilado sobre el mapa de barrios ({sector: [variantes]}).
+
+    Las variantes se limpian y ordenan una sola vez (más largas primero) y se
+    guardan en un diccionario por nombre limpio. Como un texto limpio solo
+    contiene palabras separadas por un espacio, "la variante aparece con límites
+    de palabra" equivale a "la variante es una secuencia contigua de palabras
+    del texto", así que basta con consultar los n-gramas del input.
+
+    Si el índice se creó desde un archivo, se recarga solo cuando cambia su mtime.
+    El índice compartido por los procesos vive en la BD (ver neighborhood_store).
+    """
+
+    # Longitudes mínimas heredadas de auto_resolve / resolve_specific_variant
+    MIN_SECTOR_LEN = 4
+    MIN_VARIANT_LEN = 3
+
+    # La versión es una huella del contenido (las subclases pueden usar otra)
+    versioned_by_content = True
+
+    def __init__(self, path: Optional[str] = NEIGHBORHOOD_MAP_PATH, nb_map: Optional[dict] = None,
+                 check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._last_check = 0.0
+        # (nb_map, entries, known, max_words, version, trigram) se reemplaza de forma atómica
+        self._state = ({}, {}, frozenset(), 0, None, TrigramIndex([]))
+
+        if nb_map is not None:
+            self.path = None
+            self._state = self._build(nb_map)
+        else:
+            self.reload()
+
+    @classmethod
+    def from_map(cls, nb_map: dict) -> "NeighborhoodIndex":
+        """Construye un índice en memoria (sin archivo ni recarga)."""
+        return cls(nb_map=nb_map)
+
+    @staticmethod
+    def _build(nb_map: dict, version=None):
+        pairs = []
+        known = set()
+        for category, variants in nb_map.items():
+            if isinstance(variants, list):
+                for v in variants:
+                    clean_v = clean_neighborhood_name(v)
+                    known.add(clean_v)
+                    pairs.append((clean_v, v, category))
+
+        # CRITICO: más largas primero (orden estable), igual que la versión original
+        pairs.sort(key=lambda p: len(p[0]), reverse=True)
+
+        entries = {}
+        fuzzy_variants = []
+        max_words = 0
+        for rank, (clean_v, v, category) in enumerate(pairs):
+            if len(clean_v) < NeighborhoodIndex.MIN_VARIANT_LEN or clean_v in IGNORE_KEYWORDS:
+                continue
+            if clean_v not in entries:
+                entries[clean_v] = (rank, category, v)
+                fuzzy_variants.append((clean_v, v, category))
+                max_words = max(max_words, clean_v.count(" ") + 1)
+
+        # Huella del contenido: cambia solo si cambia el mapa
+        if version is None:
+            version = hashlib.sha1(
+                json.dumps(nb_map, sort_keys=True, ensure_ascii=False).encode("utf-8")
+            ).hexdigest()
+
+        return (nb_map, entries, frozenset(known), max_words, version, TrigramIndex(fuzzy_variants))
+
+    def reload(self):
+        """Relee el mapa desde disco y reconstruye el índice."""
+        if not self.path:
+            return
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                with open(self.path, "r", encoding="utf-8") as f:
+                    nb_map = json.load(f)
+            except Exception as e:
+                print(f"Error cargando el mapa de barrios desde {self.path}: {e}")
+                return
+            self._state = self._build(nb_map)
+            self._mtime = mtime
+            self._last_check = time.monotonic()
+
+    def refresh(self):
+        """Recarga el índice si el archivo cambió (como máximo cada `check_interval` segundos)."""
+        if not self.path:
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    @property
+    def nb_map(self) -> dict:
+        self.refresh()
+        return self._state[0]
+
+    @property
+    def version(self):
+        """Huella del mapa cargado, para saber si hay que reclasificar la BD."""
+        self.refresh()
+        return self._state[4]
+
+    def add_variant(self, category: str, variant: str) -> bool:
+        """Añade una variante al mapa en memoria. Usar `save()` para persistirla."""
+        self.refresh()
+        with self._lock:
+            nb_map = self._state[0]
+            if variant in nb_map.get(category, []):
+                return False
+            nb_map.setdefault(category, []).append(variant)
+            self._state = self._build(nb_map, None if self.versioned_by_content else self._state[4])
+        return True
+
+    def save(self):
+        """Escribe el mapa actual en disco (reemplazo atómico del archivo)."""
+        if not self.path:
+            return
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._state[0], f, indent=4, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._mtime = os.stat(self.path).st_mtime_ns
+
+    def resolve(self, text: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Resuelve en una sola pasada (sector, variante específica).
+        Ej: "Casa en Prado Verde, Medellín" -> ("Corregimientos", "Prado Verde")
+        """
+        self.refresh()
+        _, entries, _, max_words, _, _ = self._state
+
+        clean_input = clean_neighborhood_name(text)
+        if not clean_input or len(clean_input) < 3:
+            return None, None
+
+        tokens = clean_input.split(" ")
+        n_tokens = len(tokens)
+        best_sector = None
+        best_variant = None
+
+        for i in range(n_tokens):
+            key = tokens[i]
+            for j in range(i + 1, min(i + max_words, n_tokens) + 1):
+                if j > i + 1:
+                    key = f"{key} {tokens[j - 1]}"
+                entry = entries.get(key)
+                if entry is None:
+                    continue
+                if best_variant is None or entry[0] < best_variant[0]:
+                    best_variant = entry
+                if len(key) >= self.MIN_SECTOR_LEN and (best_sector is None or entry[0] < best_sector[0]):
+                    best_sector = entry
+
+        return (
+            best_sector[1] if best_sector else None,
+            best_variant[2] if best_variant else None,
+        )
+
+    def resolve_sector(self, text: str) -> Optional[str]:
+        return self.resolve(text)[0]
+
+    def resolve_variant(self, text: str) -> Optional[str]:
+        return self.resolve(text)[1]
+
+    def suggest(self, text: str, k: int = 5, min_score: float = 0.0) -> List[Tuple[str, str, float]]:
+        """
+        Sugerencias difusas por similitud de trigramas para lo que no resuelve
+        `resolve()`. Ej: "Belen Los Alpez" -> [("Los Alpes", "C16 - Belén", 0.444), ...]
+        """
+        self.refresh()
+        return self._state[5].suggest(text, k=k, min_score=min_score)
+
+    def fuzzy_resolve(self, location: str, threshold: float) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Mejor sugerencia por encima de `threshold` entre las partes de la ubicación
+        ("Laurelez, Medellín" -> se evalúa "Laurelez" y "Medellín" por separado).
+        """
+        best = None
+        for part in (location or "").split(","):
+            for variant, category, score in self.suggest(part, k=1, min_score=threshold):
+                if best is None or score > best[2]:
+                    best = (variant, category, score)
+        return (best[1], best[0]) if best else (None, None)
+
+    def classify(self, location: str, title: str, fuzzy_threshold: Optional[float] = None) -> Tuple[str, Optional[str]]:
+        """
+        Clasificación completa de un inmueble: (sector, nombre específico).
+        Se intenta primero con la ubicación y luego con el título.
+        Con `fuzzy_threshold`, si nada coincide exacto se usa la mejor sugerencia difusa.
+        """
+        sector, variant = self.resolve(location or "")
+        if not sector or not variant:
+            title_sector, title_variant = self.resolve(title or "")
+            sector = sector or title_sector
+            variant = variant or title_variant
+        if not sector and fuzzy_threshold:
+            sector, fuzzy_variant = self.fuzzy_resolve(location, fuzzy_threshold)
+            variant = variant or fuzzy_variant
+        return sector or UNCLASSIFIED_SECTOR, variant
+
+    def contains(self, neighborhood: str) -> bool:
+        """Verifica si un barrio (o su forma normalizada) ya existe en el mapa."""
+        self.refresh()
+        clean_name = clean_neighborhood_name(neighborhood)
+        if not clean_name:
+            return False
+        return clean_name in self._state[2]
+
+
 def is_neighborhood_in_map(neighborhood: str, nb_map: dict) -> bool:
     """
     Verifica si un barrio (o su forma normalizada) ya existe en el mapa.
     """
-    clean_name = clean_neighborhood_name(neighborhood)
-    if not clean_name:
-        return False
-        
-    for category, variants in nb_map.items():
-        for v in variants:
-            if clean_name == clean_neighborhood_name(v):
-                return True
-    return False
+    return NeighborhoodIndex.from_map(nb_map).contains(neighborhood)
 
 def auto_resolve_neighborhood(neighborhood: str, nb_map: dict) -> Optional[str]:
     """
@@ -51,77 +344,15 @@ def auto_resolve_neighborhood(neighborhood: str, nb_map: dict) -> Optional[str]:
     Si encuentra una coincidencia fuerte, devuelve la categoría (Ej: 'C16 - Belén').
     Ahora prioriza las variantes más largas para evitar falsos positivos
     (ej: confundir 'Santa Fe de Antioquia' con 'Santa Fe').
+    Para llamadas repetidas usar `neighborhood_store.get_neighborhood_index()`.
     """
-    clean_input = clean_neighborhood_name(neighborhood)
-    if not clean_input or len(clean_input) < 3:
-        return None
-
-    # Lista de palabras a ignorar por ser demasiado genéricas
-    ignore_keywords = {"la", "el", "los", "las", "del", "sur", "norte", "oriente", "occidente"}
-
-    # Recolectar tuplas (variante, categoria)
-    all_pairs = []
-    for category, variants in nb_map.items():
-        if isinstance(variants, list):
-            for v in variants:
-                all_pairs.append((v, category))
-    
-    # Ordenar por longitud de la variante descendente
-    # Así "Santa Fe de Antioquia" (largo) se evalúa antes que "Santa Fe" (corto)
-    all_pairs.sort(key=lambda pair: len(clean_neighborhood_name(pair[0])), reverse=True)
-
-    for variant, category in all_pairs:
-        clean_variant = clean_neighborhood_name(variant)
-        
-        # Validaciones de longitud mínima
-        if len(clean_variant) < 4 or clean_variant in ignore_keywords:
-            continue
-        
-        # Caso 1: La variante está contenida en el input con limites de palabra
-        if re.search(rf'\b{re.escape(clean_variant)}\b', clean_input):
-            return category
-            
-        # Caso 2: Match exacto (por si acaso regex falla o algo raro)
-        if clean_variant == clean_input:
-             return category
-
-    return None
+    return NeighborhoodIndex.from_map(nb_map).resolve_sector(neighborhood)
 
 def resolve_specific_variant(neighborhood: str, nb_map: dict) -> Optional[str]:
     """
     Busca el nombre específico del barrio (la variante bonita del mapa)
     que coincida con el input sucio.
     Ej: "Calasanz, Medellín" -> "Calasanz"
+    Para llamadas repetidas usar `neighborhood_store.get_neighborhood_index()`.
     """
-    clean_input = clean_neighborhood_name(neighborhood)
-    if not clean_input or len(clean_input) < 3:
-        return None
-        
-    ignore_keywords = {"la", "el", "los", "las", "del", "sur", "norte", "oriente", "occidente"}
-
-    # Recolectar todas las variantes posibles en una lista
-    all_variants = []
-    for category, variants in nb_map.items():
-        if isinstance(variants, list):
-            all_variants.extend(variants)
-            
-    # CRITICO: Ordenar por longitud descendente para evitar que 
-    # "Prado" haga match con "Prado Verde" antes de tiempo.
-    all_variants.sort(key=lambda v: len(clean_neighborhood_name(v)), reverse=True)
-
-    # 1. Búsqueda
-    for v in all_variants:
-        clean_v = clean_neighborhood_name(v)
-        if len(clean_v) < 3 or clean_v in ignore_keywords:
-            continue
-            
-        # Match Exacto
-        if clean_v == clean_input:
-            return v
-            
-        # Match Contención (Input tien variante)
-        # Ej: "Casa en Prado Verde" tiene "Prado Verde" -> Match
-        if re.search(rf'\b{re.escape(clean_v)}\b', clean_input):
-            return v
-                
-    return None
+    return NeighborhoodIndex.from_map(nb_map).resolve_variant(neighborhood)
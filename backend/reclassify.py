@@ -0,0 +1,252 @@
+"""
+Bulk reclassification of stored properties (sector + neighborhood_normalized).
+
+Replaces migrate_sectors.py and one-off fixes such as fix_conquistadores_location.py.
+Rows are streamed with a server-side cursor, classified in chunks on a process pool
+and written back through a temp table and a single UPDATE ... FROM per chunk.
+Progress is checkpointed after every chunk so an interrupted run can be resumed.
+The schema must be current (`alembic upgrade head`).
+
+Usage:
+    python reclassify.py                                  # whole table
+    python reclassify.py --sector "Sin Clasificar"        # only unclassified rows
+    python reclassify.py --source conquistadores --infer-location-from-title
+    python reclassify.py --resume                         # continue an interrupted run
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from sqlalchemy import select
+from database import engine
+from models import Property
+from neighborhood_utils import NeighborhoodIndex, UNCLASSIFIED_SECTOR
+from neighborhood_store import get_neighborhood_index
+from geo import get_gazetteer
+from scrapers.config import SEARCH_CRITERIA
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("Reclassify")
+
+CHECKPOINT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".reclassify_checkpoint.json")
+
+def infer_location_from_title(index, location: Optional[str], title: Optional[str]) -> Optional[str]:
+    """
+    Prefix the neighborhood found in the title when the location is generic
+    (ej: "Medellín, Antioquia" + "Apartamento en Belén" -> "Belén, Medellín, Antioquia").
+    Returns None when the location should stay as it is.
+    """
+    inferred_category = index.resolve_sector(title or "")
+    if not inferred_category:
+        return None
+
+    location = location or ""
+    # "C16 - Belén" -> "Belén"
+    clean_name = inferred_category.split(" - ")[-1]
+    if clean_name.lower() in location.lower():
+        return None
+    return f"{clean_name}, {location}" if location else clean_name
+
+# Map of a pool worker, built by _init_worker (in-process runs use the shared index)
+_worker_index: Optional[NeighborhoodIndex] = None
+
+def _init_worker(nb_map: dict):
+    """
+    ProcessPool initializer: a plain in-memory index of the parent's map, so the
+    workers open no DB connection and start no Redis listener of their own.
+    """
+    global _worker_index
+    # Pooled connections inherited through fork belong to the parent: never reuse them here
+    engine.dispose(close=False)
+    _worker_index = NeighborhoodIndex.from_map(nb_map)
+
+def classify_chunk(rows: list, infer_location: bool = False):
+    """
+    Worker entry point: classify one chunk and return only the rows that changed.
+    rows: [(id, location, title, sector, neighborhood_normalized), ...]
+    Changed rows also get the coordinates of their new sector/variant.
+    """
+    index = _worker_index or get_neighborhood_index()
+    gazetteer = get_gazetteer()
+    changes = []
+    unclassified = 0
+
+    for prop_id, location, title, sector, normalized in rows:
+        new_location = infer_location_from_title(index, location, title) if infer_location else None
+        new_sector, new_normalized = index.classify(
+            new_location or location, title, SEARCH_CRITERIA.get("fuzzy_match_threshold")
+        )
+
+        if new_sector == UNCLASSIFIED_SECTOR:
+            unclassified += 1
+        if new_location or new_sector != sector or new_normalized != normalized:
+            point = gazetteer.locate(new_sector, new_normalized)
+            changes.append((prop_id, new_sector, new_normalized, new_location,
+                            point.get("latitude"), point.get("longitude"), point.get("geohash")))
+
+    return rows[-1][0], len(rows), unclassified, changes
+
+def _copy_value(value) -> str:
+    """Encode a value for COPY ... FROM STDIN (text format)."""
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+def write_changes(changes: list) -> int:
+    """COPY the changed rows into a temp table and apply them with one UPDATE ... FROM."""
+    if not changes:
+        return 0
+
+    buf = io.StringIO()
+    for row in changes:
+        buf.write("\t".join(_copy_value(v) for v in row) + "\n")
+    buf.seek(0)
+
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute(
+            "CREATE TEMP TABLE reclassify_tmp ("
+            " id INTEGER PRIMARY KEY, sector VARCHAR,"
+            " neighborhood_normalized VARCHAR, location VARCHAR,"
+            " latitude DOUBLE PRECISION, longitude DOUBLE PRECISION, geohash VARCHAR"
+            ") ON COMMIT DROP"
+        )
+        cur.copy_expert("COPY reclassify_tmp FROM STDIN", buf)
+        cur.execute(
+            "UPDATE properties AS p"
+            " SET sector = t.sector,"
+            "     neighborhood_normalized = t.neighborhood_normalized,"
+            "     location = COALESCE(t.location, p.location),"
+            "     latitude = t.latitude, longitude = t.longitude, geohash = t.geohash"
+            " FROM reclassify_tmp AS t"
+            " WHERE p.id = t.id"
+        )
+        updated = cur.rowcount
+        raw.commit()
+        return updated
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+def _load_checkpoint(path: str, signature: dict) -> int:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if checkpoint.get("signature") != signature:
+        logger.warning("Checkpoint belongs to a different map version or filter, starting over.")
+        return 0
+    return checkpoint.get("last_id", 0)
+
+def _save_checkpoint(path: str, signature: dict, last_id: int):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"signature": signature, "last_id": last_id}, f)
+
+def reclassify(
+    source: Optional[str] = None,
+    sector: Optional[str] = None,
+    infer_location: bool = False,
+    chunk_size: int = 5000,
+    workers: Optional[int] = None,
+    resume: bool = False,
+    dry_run: bool = False,
+    checkpoint_path: str = CHECKPOINT_PATH,
+) -> dict:
+    """
+    Recompute sector and neighborhood_normalized for the matching properties.
+    `workers=1` classifies in-process (required inside Celery's daemonic workers).
+    """
+
+    index = get_neighborhood_index()
+    workers = workers or os.cpu_count() or 1
+    signature = {"map_version": index.version, "source": source, "sector": sector,
+                 "infer_location": infer_location}
+    start_id = _load_checkpoint(checkpoint_path, signature) if resume else 0
+    if start_id:
+        logger.info(f"Resuming after property id {start_id}")
+
+    stmt = select(
+        Property.id, Property.location, Property.title,
+        Property.sector, Property.neighborhood_normalized,
+    ).where(Property.id > start_id).order_by(Property.id)
+    if source:
+        stmt = stmt.where(Property.source == source)
+    if sector:
+        stmt = stmt.where(Property.sector == sector)
+
+    stats = {"scanned": 0, "changed": 0, "updated": 0, "unclassified": 0}
+    started = time.monotonic()
+
+    def apply(result):
+        last_id, scanned, unclassified, changes = result
+        stats["scanned"] += scanned
+        stats["unclassified"] += unclassified
+        stats["changed"] += len(changes)
+        if not dry_run:
+            stats["updated"] += write_changes(changes)
+            _save_checkpoint(checkpoint_path, signature, last_id)
+        logger.info(f"Up to id {last_id}: {stats['scanned']} scanned, {stats['changed']} changed")
+
+    executor = None
+    if workers > 1:
+        # The map is loaded once here and handed to every worker
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index.nb_map,))
+    try:
+        with engine.connect() as conn:
+            # Server-side cursor: only `chunk_size` rows are held in memory at a time
+            result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+            in_flight = deque()
+            for partition in result.partitions():
+                rows = [tuple(r) for r in partition]
+                if executor is None:
+                    apply(classify_chunk(rows, infer_location))
+                    continue
+                in_flight.append(executor.submit(classify_chunk, rows, infer_location))
+                # Bounded pipeline, results applied in id order so the checkpoint stays valid
+                if len(in_flight) >= workers * 2:
+                    apply(in_flight.popleft().result())
+            while in_flight:
+                apply(in_flight.popleft().result())
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if not dry_run and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    stats["seconds"] = round(time.monotonic() - started, 2)
+    logger.info(f"Reclassification complete: {stats}")
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk reclassification of properties after a neighborhood map change")
+    parser.add_argument("--source", help="Only properties from this portal (e.g., conquistadores)")
+    parser.add_argument("--sector", help="Only properties currently in this sector (e.g., 'Sin Clasificar')")
+    parser.add_argument("--infer-location-from-title", action="store_true",
+                        help="Prefix the neighborhood found in the title when the location is generic")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Rows per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="Classification processes (default: CPU count)")
+    parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="Classify and report without writing")
+
+    args = parser.parse_args()
+    reclassify(
+        source=args.source,
+        sector=args.sector,
+        infer_location=args.infer_location_from_title,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        resume=args.resume,
+        dry_run=args.dry_run,
+    )
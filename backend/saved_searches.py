@@ -0,0 +1,104 @@
+"""
+Saved searches compiled into in-memory predicates.
+
+The ingest path (crud.upsert_properties) checks every new or changed listing of a
+batch against each saved search as it is written and records hits in
+saved_search_matches: one predicate evaluation per search and listing, instead
+of every client re-running the full /properties query to find what is new.
+The criteria are the FiltersBar filters, with the same meaning as in
+crud.filter_properties().
+"""
+import json
+import unicodedata
+from dataclasses import dataclass
+from typing import Optional
+
+def fold(text: Optional[str]) -> str:
+    """Lower-case without accents, like lower(f_unaccent(...)) on search_text."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+def _number(value) -> Optional[float]:
+    # FiltersBar sends "" for unset fields and numbers as strings
+    if value is None or value == "":
+        return None
+    return float(value)
+
+@dataclass(frozen=True)
+class SearchPredicate:
+    source: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_area: Optional[float] = None
+    max_area: Optional[float] = None
+    neighborhood: Optional[str] = None
+    search: Optional[str] = None  # already folded
+
+    def matches(self, data: dict) -> bool:
+        """`data` is a property dict as produced by the scrapers."""
+        if self.source and data.get("source") != self.source:
+            return False
+        if self.neighborhood and data.get("sector") != self.neighborhood:
+            return False
+        # Range filters never match a missing value (SQL NULL comparison)
+        for bound, field, below in (
+            (self.min_price, "price", False), (self.max_price, "price", True),
+            (self.min_area, "area", False), (self.max_area, "area", True),
+        ):
+            if bound is None:
+                continue
+            value = data.get(field)
+            if value is None or (value > bound if below else value < bound):
+                return False
+        if self.search:
+            text = " ".join(data.get(f) or "" for f in ("title", "location", "description"))
+            if self.search not in fold(text):
+                return False
+        return True
+
+def compile_criteria(criteria: dict) -> SearchPredicate:
+    """Build the predicate of a saved search; raises ValueError on malformed criteria."""
+    if not isinstance(criteria, dict):
+        raise ValueError("criteria must be an object")
+    try:
+        return SearchPredicate(
+            source=criteria.get("source") or None,
+            min_price=_number(criteria.get("min_price")),
+            max_price=_number(criteria.get("max_price")),
+            min_area=_number(criteria.get("min_area")),
+            max_area=_number(criteria.get("max_area")),
+            neighborhood=criteria.get("neighborhood") or None,
+            search=fold(criteria.get("search")) or None,
+        )
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid criteria: {e}") from e
+
+# (search id, criteria JSON) -> predicate; criteria are only compiled once per process
+_compiled = {}
+
+def get_predicate(search_id: int, criteria_json: str) -> Optional[SearchPredicate]:
+    key = (search_id, criteria_json)
+    if key not in _compiled:
+        try:
+            _compiled[key] = compile_criteria(json.loads(criteria_json))
+        except ValueError:
+            # Stored before criteria were validated: never matches
+            _compiled[key] = None
+    return _compiled[key]
+
+def match_rows(searches, rows: dict, returned) -> list:
+    """
+    saved_search_matches rows for the listings written by an upsert.
+    searches: [(id, criteria_json)], rows: {link: data}, returned: [(id, link, ...)].
+    """
+    predicates = [(search_id, get_predicate(search_id, criteria)) for search_id, criteria in searches]
+    predicates = [(search_id, p) for search_id, p in predicates if p is not None]
+    matches = []
+    for row in returned:
+        data = rows[row.link]
+        for search_id, predicate in predicates:
+            if predicate.matches(data):
+                matches.append({"saved_search_id": search_id, "property_id": row.id})
+    return matches
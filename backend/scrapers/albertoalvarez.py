@@ -57,6 +57,7 @@ class AlbertoAlvarezScraper(BaseScraper):
                 
             logger.info(f"[{self.portal_name}] Encontrados {len(cards)} inmuebles en la página {page_num}")
             
+            candidates = []
             for card in cards:
                 try:
                     # Alberto Alvarez incluye un JSON en un textarea oculto, ¡muy útil!
@@ -122,20 +123,22 @@ class AlbertoAlvarezScraper(BaseScraper):
                         "bathrooms": float(bathrooms) if bathrooms else 0
                     }
                     
-                    status = await self.process_property(entry)
-                    
-                    if status == "existing":
-                        consecutive_existing += 1
-                    elif status in ["new", "updated"]:
-                        consecutive_existing = 0
-                    
-                    if self.should_stop_scraping(consecutive_existing):
-                        logger.info(f"[{self.portal_name}] Límite de inmuebles existentes alcanzado.")
-                        return 
+                    candidates.append(entry)
 
                 except Exception as e:
                     logger.error(f"[{self.portal_name}] Error procesando card: {e}")
                     continue
+
+            # Whole page in one round trip; the stop rule still counts card by card
+            for status in await self.process_properties(candidates):
+                if status == "existing":
+                    consecutive_existing += 1
+                elif status in ["new", "updated"]:
+                    consecutive_existing = 0
+                
+                if self.should_stop_scraping(consecutive_existing):
+                    logger.info(f"[{self.portal_name}] Límite de inmuebles existentes alcanzado.")
+                    return
             
             page_num += 1
             await self.page.wait_for_timeout(1500)
@@ -22,8 +22,7 @@ class AportalScraper(BaseScraper):
             cards = soup.select(".properties")
             logger.info(f"[{self.portal_name}] Found {len(cards)} properties")
             
-            consecutive_existing = 0
-
+            candidates = []
             for card in cards:
                 try:
                     # Skip if "No Disponible"
@@ -61,7 +60,7 @@ class AportalScraper(BaseScraper):
                     # This site doesn't show area/rooms in the card list (only detail page)
                     # For now, following Phase 1/2 style of extraction from list.
                     
-                    status = await self.process_property({
+                    candidates.append({
                         "title": title,
                         "price": price,
                         "location": location,
@@ -70,18 +69,13 @@ class AportalScraper(BaseScraper):
                         "source": self.portal_name
                     })
 
-                    # Stop logic
-                    if status == "existing":
-                        consecutive_existing += 1
-                    elif status == "new" or status == "updated":
-                        consecutive_existing = 0
-                    
-                    if self.should_stop_scraping(consecutive_existing):
-                        break
-
                 except Exception as e:
                     logger.error(f"[{self.portal_name}] Error parsing card: {e}")
                     continue
+
+            # Single listing page: everything is saved in one round trip,
+            # so there is nothing left to skip with the consecutive-existing rule
+            await self.process_properties(candidates)
         except Exception as e:
             logger.error(f"[{self.portal_name}] Error during scrape: {e}")
         finally:
@@ -1,23 +1,36 @@
 import logging
 import asyncio
 from abc import ABC, abstractmethod
+from collections import Counter
 from sqlalchemy.orm import Session
 from playwright.async_api import Page, async_playwright, Browser, BrowserContext
-from crud import create_property, get_property_by_link, update_property_last_seen, update_property_price
+from crud import upsert_properties_async, touch_properties_async
+from database import AsyncSessionLocal
+from core.cache import bump_data_generation
+from geo import get_gazetteer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-from .config import SEARCH_CRITERIA, should_include_property
+from .config import SEARCH_CRITERIA, should_include_property, NeighborhoodDiscoveryBuffer
 
 class BaseScraper(ABC):
+    # Unchanged listings buffered before an intermediate last_seen refresh
+    seen_flush_size = 5000
+
     def __init__(self, db: Session):
         self.db = db
         self.portal_name = "generic" # Should be overwritten
         # Local Deep Scrape Configuration
         self.seed_mode = False
         self.max_pages = 20 # Default limit, overridden in seed_mode
+        # Neighborhoods discovered during this run, flushed once at the end
+        self.discovery = NeighborhoodDiscoveryBuffer()
+        # Cards rejected by the pre-save filters during this run, per reason
+        self.skip_counts = Counter()
+        # Listings seen without changes; last_seen is refreshed in one UPDATE (see flush_seen)
+        self.seen_ids = set()
         
         self.browser: Browser = None
         self.context: BrowserContext = None
@@ -64,94 +77,163 @@ class BaseScraper(ABC):
         """Main scraping logic to be implemented by subclasses."""
         pass
 
-    async def process_property(self, data: dict) -> str:
+    async def run(self):
+        """Run a full scrape and flush per-run buffers when it ends (even on errors)."""
+        try:
+            await self.scrape()
+        finally:
+            await self.flush_seen()
+            bump_data_generation()
+            await asyncio.to_thread(self.discovery.flush, self.db)
+            if self.skip_counts:
+                logger.info(f"[{self.portal_name}] Skipped by pre-save filters: {dict(self.skip_counts)}")
+
+    def filter_candidates(self, batch: list) -> list:
         """
-        Standard logic to save or update a property.
-        'data' dictionary must contain: title, price, location, link
-        
-        Returns:
-            str: 'new', 'updated', 'existing', or 'skipped'
+        Pre-save filter stage for a page of candidate dicts.
+        Cheap checks run over the whole batch first (price, then target cities);
+        only the survivors get the sector classification.
+        Skipped cards are counted per reason in self.skip_counts.
         """
-        link = data["link"]
-        title = data.get("title", "")
-        location = data.get("location", "")
-        price = data.get("price", 0)
+        max_price = SEARCH_CRITERIA["max_price"]
+
+        # --- PHASE 5: Pre-Save Filtering ---
+        survivors = []
+        for data in batch:
+            title = data.get("title", "")
+            location = data.get("location", "")
+            price = data.get("price") or 0
+
+            # 1. Price Check
+            if price > max_price:
+                self.skip_counts["price"] += 1
+                logger.debug(f"[{self.portal_name}] Skipped (Price > {max_price}): {price} - {data['link']}")
+                continue
 
-        # Ensure source is set
-        if "source" not in data:
-            data["source"] = self.portal_name
+            # 2. Location/Zone Check
+            if not should_include_property(title, location, self.discovery):
+                self.skip_counts["zone"] += 1
+                logger.debug(f"[{self.portal_name}] Skipped (Zone not matched): {title} | {location} - {data['link']}")
+                continue
+
+            survivors.append(data)
+        # -----------------------------------
 
         # --- Calculate Sector (Static Classification) ---
-        if "sector" not in data:
-            import json
-            from neighborhood_utils import auto_resolve_neighborhood
-            
+        from neighborhood_utils import UNCLASSIFIED_SECTOR
+        from neighborhood_store import get_neighborhood_index
+
+        fuzzy_threshold = SEARCH_CRITERIA.get("fuzzy_match_threshold")
+        for data in survivors:
+            # Ensure source is set
+            data.setdefault("source", self.portal_name)
+
+            if "sector" in data and "neighborhood_normalized" in data:
+                continue
             try:
-                with open("neighborhood_map.json", "r", encoding="utf-8") as f:
-                    nb_map = json.load(f)
-                
-                # Try location first, then title
-                sector = auto_resolve_neighborhood(location, nb_map)
-                if not sector:
-                    sector = auto_resolve_neighborhood(title, nb_map)
-                
-                # Default to "Sin Clasificar" if no match
-                data["sector"] = sector if sector else "Sin Clasificar"
+                # Location first, then title; defaults to "Sin Clasificar"
+                sector, specific_name = get_neighborhood_index().classify(
+                    data.get("location", ""), data.get("title", ""), fuzzy_threshold
+                )
             except Exception as e:
                 logger.warning(f"[{self.portal_name}] Failed to calculate sector: {e}")
-                data["sector"] = "Sin Clasificar"
-        # ----------------------------------------------
+                sector, specific_name = UNCLASSIFIED_SECTOR, None
 
-        # --- PHASE 5: Pre-Save Filtering ---
-        # 1. Price Check
-        if price > SEARCH_CRITERIA["max_price"]:
-            logger.debug(f"[{self.portal_name}] Skipped (Price > {SEARCH_CRITERIA['max_price']}): {price} - {link}")
-            return "skipped"
-
-        # 2. Location/Zone Check
-        if not should_include_property(title, location):
-            logger.debug(f"[{self.portal_name}] Skipped (Zone not matched): {title} | {location} - {link}")
-            return "skipped"
-        # -----------------------------------
+            data.setdefault("sector", sector)
+            data.setdefault("neighborhood_normalized", specific_name)
 
-        # --- DB Persist (Async-safe) ---
-        # Moving synchronous DB calls to a separate thread to avoid blocking the event loop
-        def persist_db():
-            existing = get_property_by_link(self.db, link)
-            
-            if existing:
-                update_property_last_seen(self.db, existing)
-                has_updates = False
-
-                # Update price if changed
-                if existing.price != data["price"]:
-                    update_property_price(self.db, existing, data["price"])
-                    has_updates = True
-                
-                # Update metadata if changed
-                if (existing.area != data.get("area") or 
-                    existing.bedrooms != data.get("bedrooms") or 
-                    existing.bathrooms != data.get("bathrooms")):
-                    
-                    from crud import update_property_metadata
-                    update_property_metadata(self.db, existing, data)
-                    has_updates = True
-
-                return "updated" if has_updates else "existing"
-            else:
-                create_property(self.db, data)
-                return "new"
+        # Approximate coordinates (offline gazetteer) for radius search
+        gazetteer = get_gazetteer()
+        for data in survivors:
+            if "geohash" not in data:
+                data.update(gazetteer.locate(data.get("sector"), data.get("neighborhood_normalized")))
+        # ----------------------------------------------
+
+        return survivors
 
-        status = await asyncio.to_thread(persist_db)
+    async def process_property(self, data: dict) -> str:
+        """
+        Standard logic to filter, classify and save or update a property.
+        'data' dictionary must contain: title, price, location, link
         
-        if status == "updated":
-            logger.info(f"[{self.portal_name}] Updated Price: {link}")
-        elif status == "existing":
-            logger.info(f"[{self.portal_name}] Seen (No Change): {link}")
-        elif status == "new":
-            logger.info(f"[{self.portal_name}] Created: {link}")
-            
-        return status
+        Returns:
+            str: 'new', 'updated', 'existing', or 'skipped'
+        """
+        return (await self.process_properties([data]))[0]
+
+    async def process_properties(self, batch: list) -> list:
+        """
+        Page-level version of process_property: filter and classify the whole
+        page, then save the survivors in a single round trip.
+
+        Returns:
+            list: one status per item of 'batch', in the same order
+            ('new', 'updated', 'existing', 'skipped' or 'error'), so callers
+            can keep counting consecutive existing items for should_stop_scraping.
+        """
+        survivors = self.filter_candidates(batch)
+        saved = dict(zip(map(id, survivors), await self.save_properties(survivors)))
+        return [saved.get(id(data), "skipped") for data in batch]
+
+    async def save_property(self, data: dict) -> str:
+        """
+        Save or update a property that already went through filter_candidates().
+
+        Returns:
+            str: 'new', 'updated' or 'existing'
+        """
+        return (await self.save_properties([data]))[0]
+
+    async def save_properties(self, batch: list) -> list:
+        """
+        Upsert a batch that already went through filter_candidates() with one
+        SELECT and one INSERT ... ON CONFLICT (one commit for the whole page).
+
+        Returns:
+            list: 'new', 'updated' or 'existing' per item ('error' if the batch failed)
+        """
+        if not batch:
+            return []
+
+        # --- DB Persist (asyncpg) ---
+        # One short-lived AsyncSession per batch: no thread hops and no session shared
+        # between scrapers or property-type loops running in the same event loop
+        try:
+            async with AsyncSessionLocal() as session:
+                statuses = await upsert_properties_async(session, batch, self.seen_ids)
+        except Exception as e:
+            logger.error(f"[{self.portal_name}] Error saving batch of {len(batch)}: {e}")
+            return ["error"] * len(batch)
+
+        for data, status in zip(batch, statuses):
+            if status == "updated":
+                logger.info(f"[{self.portal_name}] Updated Price: {data['link']}")
+            elif status == "existing":
+                logger.info(f"[{self.portal_name}] Seen (No Change): {data['link']}")
+            elif status == "new":
+                logger.info(f"[{self.portal_name}] Created: {data['link']}")
+
+        # New listings and price changes show up in the API right away (cached responses are dropped)
+        if "new" in statuses or "updated" in statuses:
+            bump_data_generation()
+
+        # Long seed runs: keep the pending refresh bounded
+        if len(self.seen_ids) >= self.seen_flush_size:
+            await self.flush_seen()
+
+        return statuses
+
+    async def flush_seen(self):
+        """Refresh last_seen/active of every unchanged listing seen so far with one UPDATE ... WHERE id = ANY(:ids)."""
+        if not self.seen_ids:
+            return
+        ids, self.seen_ids = self.seen_ids, set()
+        try:
+            async with AsyncSessionLocal() as session:
+                touched = await touch_properties_async(session, ids)
+            logger.info(f"[{self.portal_name}] Refreshed last_seen of {touched} unchanged listings")
+        except Exception as e:
+            logger.error(f"[{self.portal_name}] Error refreshing last_seen of {len(ids)} listings: {e}")
 
     def should_stop_scraping(self, consecutive_existing: int, max_consecutive: int = 10) -> bool:
         """
@@ -1,7 +1,8 @@
-import os
-import json
+import re
 import unicodedata
-from neighborhood_utils import clean_neighborhood_name, is_neighborhood_in_map, auto_resolve_neighborhood
+from sqlalchemy.orm import Session
+from neighborhood_utils import clean_neighborhood_name
+from neighborhood_store import get_neighborhood_index, add_variants, add_discoveries
 
 SEARCH_CRITERIA = {
     "operation": "arriendo",
@@ -9,6 +10,9 @@ SEARCH_CRITERIA = {
     # Ahora el filtro base es por ciudad/municipio
     "target_cities": ["medellin", "medellín", "envigado", "itagui", "itagüí", "sabaneta", "la estrella", "estrella"],
     "max_price": 5000000,
+    # Similitud mínima (0-1) para clasificar por trigramas lo que no coincide exacto.
+    # None = desactivado (solo coincidencias exactas, lo demás queda "Sin Clasificar")
+    "fuzzy_match_threshold": None,
     "initial_limit": 50,
     "scroll_depth": 10
 }
@@ -23,82 +27,94 @@ def normalize_text(text: str) -> str:
     text = unicodedata.normalize('NFD', text).encode('ascii', 'ignore').decode("utf-8")
     return text
 
-def update_discovered_neighborhoods(neighborhood: str):
+class NeighborhoodDiscoveryBuffer:
     """
-    Fase 2: Automatización Progresiva.
+    Fase 2: Automatización Progresiva (write-behind).
+    Durante el scrape solo se acumulan en memoria, deduplicados por nombre limpio:
     1. Si el barrio ya está mapeado, no hace nada.
     2. Si no está mapeado pero se puede auto-resolver (contiene palabras clave),
-       se añade AUTOMÁTICAMENTE al mapa de barrios.
-    3. Si no hay forma de resolverlo, se añade a la lista de descubrimientos.
+       se guarda como auto-mapeo para el mapa de barrios.
+    3. Si no hay forma de resolverlo, se guarda como descubrimiento.
+    `flush()` escribe todo una sola vez al final de la ejecución.
     """
-    if not neighborhood: return
-    
-    nb_map_path = os.path.join(os.path.dirname(__file__), "..", "neighborhood_map.json")
-    try:
-        with open(nb_map_path, "r", encoding="utf-8") as f:
-            nb_map = json.load(f)
-        
+
+    def __init__(self):
+        self._seen = set()
+        self.auto_mapped = {}  # nombre limpio -> (categoría, nombre original)
+        self.discovered = {}   # nombre limpio -> nombre original
+
+    def record(self, neighborhood: str):
+        clean_name = clean_neighborhood_name(neighborhood)
+        if not clean_name or clean_name in self._seen:
+            return
+        self._seen.add(clean_name)
+
+        nb_index = get_neighborhood_index()
         # 1. Ya existe exacto o normalizado (Fase 1)
-        if is_neighborhood_in_map(neighborhood, nb_map):
+        if nb_index.contains(neighborhood):
             return
-            
+
         # 2. Intentar Auto-Resolución (Fase 2)
-        category = auto_resolve_neighborhood(neighborhood, nb_map)
+        category = nb_index.resolve_sector(neighborhood)
         if category:
-            # ¡Auto-Mapeo! Lo añadimos al JSON oficial
-            if neighborhood not in nb_map[category]:
-                nb_map[category].append(neighborhood)
-                with open(nb_map_path, "w", encoding="utf-8") as f:
-                    json.dump(nb_map, f, indent=4, ensure_ascii=False)
-                print(f"🤖 [Auto-Map] '{neighborhood}' asignado automáticamente a '{category}'")
+            self.auto_mapped[clean_name] = (category, neighborhood)
+        else:
+            # 3. Registrar para revisión manual
+            self.discovered[clean_name] = neighborhood
+
+    def flush(self, db: Session):
+        """Vuelca auto-mapeos y descubrimientos a la BD con upserts atómicos."""
+        if not self.auto_mapped and not self.discovered:
+            return
+
+        nb_index = get_neighborhood_index()
+        try:
+            # ¡Auto-Mapeo! Se añade al mapa oficial (sube la versión y avisa a los demás procesos)
+            new_mappings = [
+                (category, neighborhood) for category, neighborhood in self.auto_mapped.values()
+                if not nb_index.contains(neighborhood)
+            ]
+            if add_variants(db, new_mappings, reason="auto-map"):
+                for category, neighborhood in new_mappings:
+                    print(f"🤖 [Auto-Map] '{neighborhood}' asignado automáticamente a '{category}'")
+
+            add_discoveries(db, [
+                neighborhood for neighborhood in self.discovered.values()
+                if not nb_index.contains(neighborhood)
+            ])
+        except Exception as e:
+            db.rollback()
+            print(f"Error actualizando descubrimientos: {e}")
             return
 
-    except Exception as e:
-        print(f"Error procesando auto-resolución: {e}")
+        self.auto_mapped.clear()
+        self.discovered.clear()
 
-    # 3. Si llegamos aquí, no hubo match. Registrar en descubrimientos para revisión manual.
-    file_path = os.path.join(os.path.dirname(__file__), "..", "discovered_neighborhoods.json")
-    try:
-        discovered = []
-        if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                if content:
-                    discovered = json.loads(content)
-        
-        clean_new = clean_neighborhood_name(neighborhood)
-        if not any(clean_neighborhood_name(d) == clean_new for d in discovered):
-            discovered.append(neighborhood)
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(discovered, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        print(f"Error actualizando descubrimientos: {e}")
+# Ciudades objetivo normalizadas y compiladas una sola vez (antes se normalizaban por tarjeta)
+_TARGET_CITIES = set(SEARCH_CRITERIA["target_cities"])
+_TARGET_CITIES_RE = re.compile(
+    "|".join(re.escape(c) for c in sorted({normalize_text(c) for c in _TARGET_CITIES}, key=len, reverse=True))
+)
 
-def should_include_property(title: str, location: str) -> bool:
+def should_include_property(title: str, location: str, discovery: NeighborhoodDiscoveryBuffer = None) -> bool:
     """
     Ahora permite Inclusion General si coincide con las ciudades objetivo.
-    También registra el barrio para descubrimiento.
+    También registra el barrio para descubrimiento (en memoria, ver `discovery`).
     """
     if not title and not location:
         return False
 
-    norm_title = normalize_text(title)
-    norm_location = normalize_text(location)
-    
     # 1. Registro para descubrimiento (siempre que parezca una ubicación)
-    if location:
+    if location and discovery is not None:
         # Intentar extraer el barrio si viene en formato "Ciudad, Barrio" o similar
         parts = [p.strip() for p in location.split(",")]
         # Asumimos que el último o penúltimo suele ser el barrio específico en muchos portales
         for part in parts:
-            if part.lower() not in SEARCH_CRITERIA["target_cities"]:
-                update_discovered_neighborhoods(part)
+            if part.lower() not in _TARGET_CITIES:
+                discovery.record(part)
 
     # 2. Filtro de Inclusión (Ciudades permitidas)
-    target_cities = [normalize_text(c) for c in SEARCH_CRITERIA["target_cities"]]
-    
-    for city in target_cities:
-        if city in norm_title or city in norm_location:
-            return True
-            
-    return False
+    return bool(
+        _TARGET_CITIES_RE.search(normalize_text(title)) or
+        _TARGET_CITIES_RE.search(normalize_text(location))
+    )
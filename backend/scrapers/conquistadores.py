@@ -51,6 +51,7 @@ class ConquistadoresScraper(BaseScraper):
             if not cards:
                 break
                 
+            candidates = []
             for card in cards:
                 try:
                     # Título y Link
@@ -104,20 +105,22 @@ class ConquistadoresScraper(BaseScraper):
                         "bathrooms": bathrooms
                     }
                     
-                    status = await self.process_property(entry)
-                    
-                    if status == "existing":
-                        consecutive_existing += 1
-                    elif status in ["new", "updated"]:
-                        consecutive_existing = 0
-                    
-                    if self.should_stop_scraping(consecutive_existing):
-                        logger.info(f"[{self.portal_name}] Límite de existentes alcanzado.")
-                        return 
+                    candidates.append(entry)
 
                 except Exception as e:
                     logger.error(f"[{self.portal_name}] Error en card: {e}")
                     continue
+
+            # Whole page in one round trip; the stop rule still counts card by card
+            for status in await self.process_properties(candidates):
+                if status == "existing":
+                    consecutive_existing += 1
+                elif status in ["new", "updated"]:
+                    consecutive_existing = 0
+                
+                if self.should_stop_scraping(consecutive_existing):
+                    logger.info(f"[{self.portal_name}] Límite de existentes alcanzado.")
+                    return
             
             # Verificar si hay botón de "Next"
             next_btn = soup.select_one('.page-link[aria-label="Next"]')
@@ -74,6 +74,7 @@ class ElCastilloScraper(BaseScraper):
         cards = soup.select(".estate_itm")
         
         new_cards_count = 0
+        candidates = []
         for card in cards:
             try:
                 # Extract ID/Code
@@ -159,11 +160,14 @@ class ElCastilloScraper(BaseScraper):
                     "description": description
                 }
                 
-                await self.process_property(data)
+                candidates.append(data)
                 
             except Exception as e:
                 logger.error(f"[{self.portal_name}] Error parsing card {code}: {e}")
                 continue
         
+        # New cards of this scroll are saved in one round trip
+        await self.process_properties(candidates)
+
         if new_cards_count > 0:
             logger.info(f"[{self.portal_name}] Processed {new_cards_count} new cards this batch")
@@ -39,6 +39,7 @@ class EscalaInmobiliariaScraper(BaseScraper):
                 
             logger.info(f"[{self.portal_name}] Encontrados {len(cards)} inmuebles en la página {page_num}")
             
+            candidates = []
             for card in cards:
                 try:
                     # Link
@@ -101,19 +102,21 @@ class EscalaInmobiliariaScraper(BaseScraper):
                         "bathrooms": bathrooms
                     }
                     
-                    status = await self.process_property(entry)
-                    
-                    if status == "existing":
-                        consecutive_existing += 1
-                    elif status in ["new", "updated"]:
-                        consecutive_existing = 0
-                    
-                    if self.should_stop_scraping(consecutive_existing):
-                        return # Stop everything if limit reached
+                    candidates.append(entry)
 
                 except Exception as e:
                     logger.error(f"[{self.portal_name}] Error procesando card: {e}")
                     continue
+
+            # Whole page in one round trip; the stop rule still counts card by card
+            for status in await self.process_properties(candidates):
+                if status == "existing":
+                    consecutive_existing += 1
+                elif status in ["new", "updated"]:
+                    consecutive_existing = 0
+                
+                if self.should_stop_scraping(consecutive_existing):
+                    return # Stop everything if limit reached
             
             page_num += 1
             await self.page.wait_for_timeout(1000) # Respeto entre páginas
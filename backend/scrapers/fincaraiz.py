@@ -65,7 +65,7 @@ class FincaRaizScraper(BaseScraper):
             
             logger.info(f"[{self.portal_name}] Found {len(cards)} listings")
             
-            consecutive_existing = 0
+            candidates = []
 
             for i, card in enumerate(cards):
                 try:
@@ -86,8 +86,7 @@ class FincaRaizScraper(BaseScraper):
                     # LOCATION
                     location_text = await card.locator("strong.lc-location").first.text_content()
 
-                    # Process Data - base.py will filter by price and zone
-                    status = await self.process_property({
+                    candidates.append({
                         "title": title_text.strip() if title_text else "No Title",
                         "price": price,
                         "location": location_text.strip() if location_text else "Medellín",
@@ -95,25 +94,30 @@ class FincaRaizScraper(BaseScraper):
                         "source": self.portal_name
                     })
 
-                    # Stop logic
-                    if status == "existing":
-                        consecutive_existing += 1
-                    elif status == "new" or status == "updated":
-                        consecutive_existing = 0
-                    
-                    if self.should_stop_scraping(consecutive_existing):
-                        break
-
                 except Exception as e:
                     logger.error(f"Error parsing card {i}: {e}")
                     continue
+
+            # Price/zone filters run over the whole page first;
+            # only the survivors are classified and saved (one round trip)
+            consecutive_existing = 0
+
+            for status in await self.process_properties(candidates):
+                # Stop logic
+                if status == "existing":
+                    consecutive_existing += 1
+                elif status == "new" or status == "updated":
+                    consecutive_existing = 0
+                
+                if self.should_stop_scraping(consecutive_existing):
+                    break
         except Exception as e:
             logger.error(f"Error scraping url {url}: {e}")
 
 def run_scraper_manual():
     db = SessionLocal()
     scraper = FincaRaizScraper(db)
-    asyncio.run(scraper.scrape())
+    asyncio.run(scraper.run())
     db.close()
 
 if __name__ == "__main__":
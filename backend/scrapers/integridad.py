@@ -46,6 +46,7 @@ class IntegridadScraper(BaseScraper):
                     
                 logger.info(f"[{self.portal_name}] Found {len(cards)} properties on page {page_num}")
 
+                candidates = []
                 for card in cards:
                     try:
                         # Title and Link
@@ -89,7 +90,7 @@ class IntegridadScraper(BaseScraper):
                                 if num_match:
                                     bedrooms = int(num_match.group(1))
 
-                        status = await self.process_property({
+                        candidates.append({
                             "title": title,
                             "price": price,
                             "location": location,
@@ -100,15 +101,16 @@ class IntegridadScraper(BaseScraper):
                             "source": self.portal_name
                         })
 
-                        # Stop logic
-                        if status == "existing":
-                            consecutive_existing += 1
-                        elif status == "new" or status == "updated":
-                            consecutive_existing = 0
-                        
                     except Exception as e:
                         logger.error(f"[{self.portal_name}] Error parsing card: {e}")
                         continue
+
+                # Whole page in one round trip; the stop rule still counts card by card
+                for status in await self.process_properties(candidates):
+                    if status == "existing":
+                        consecutive_existing += 1
+                    elif status == "new" or status == "updated":
+                        consecutive_existing = 0
                 
                 if self.should_stop_scraping(consecutive_existing):
                     break
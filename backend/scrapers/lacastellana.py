@@ -61,6 +61,7 @@ class CastellanaScraper(BaseScraper):
                     
                     type_consecutive_existing = 0
                     
+                    candidates = []
                     for card in cards:
                         try:
                             # Title and Link
@@ -105,7 +106,7 @@ class CastellanaScraper(BaseScraper):
                                     except:
                                         pass
 
-                            status = await self.process_property({
+                            candidates.append({
                                 "title": title,
                                 "price": price,
                                 "location": location,
@@ -116,16 +117,17 @@ class CastellanaScraper(BaseScraper):
                                 "source": self.portal_name
                             })
 
-                            # Stop logic
-                            if status == "existing":
-                                type_consecutive_existing += 1
-                            elif status == "new" or status == "updated":
-                                type_consecutive_existing = 0
-                            
                         except Exception as e:
                             logger.error(f"[{self.portal_name}] Error parsing card: {e}")
                             continue
 
+                    # Whole page in one round trip; the stop rule still counts card by card
+                    for status in await self.process_properties(candidates):
+                        if status == "existing":
+                            type_consecutive_existing += 1
+                        elif status == "new" or status == "updated":
+                            type_consecutive_existing = 0
+
                     if self.should_stop_scraping(type_consecutive_existing):
                         logger.info(f"[{self.portal_name}] Existing limit reached for {p_type}. Moving to next type.")
                         break
@@ -102,6 +102,7 @@ class PandaScraper(BaseScraper):
                     if not cards:
                         break
 
+                    candidates = []
                     for i, card in enumerate(cards):
                         try:
                             # Extract data from attributes (much cleaner!)
@@ -137,7 +138,7 @@ class PandaScraper(BaseScraper):
                             except:
                                 pass
 
-                            status = await self.process_property({
+                            candidates.append({
                                 "title": title,
                                 "price": price,
                                 "location": location,
@@ -148,14 +149,16 @@ class PandaScraper(BaseScraper):
                                 "source": self.portal_name
                             })
 
-                            if status == "existing":
-                                consecutive_existing_type += 1
-                            else:
-                                consecutive_existing_type = 0
-                            
                         except Exception as e:
                             logger.error(f"[{self.portal_name}] Error parsing card {i}: {e}")
 
+                    # Whole page in one round trip; the stop rule still counts card by card
+                    for status in await self.process_properties(candidates):
+                        if status == "existing":
+                            consecutive_existing_type += 1
+                        else:
+                            consecutive_existing_type = 0
+
                     if self.should_stop_scraping(consecutive_existing_type):
                         logger.info(f"[{self.portal_name}] Stopping {type_name} due to existing limit.")
                         break
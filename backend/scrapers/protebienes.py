@@ -53,6 +53,7 @@ class ProtebienesScraper(BaseScraper):
                 # For now rely on consecutive_existing and card count.
                 # ----------------------
 
+                candidates = []
                 for card in cards:
                     try:
                         # Title and Link
@@ -96,7 +97,7 @@ class ProtebienesScraper(BaseScraper):
                                 if num_match:
                                     bedrooms = int(num_match.group(1))
 
-                        status = await self.process_property({
+                        candidates.append({
                             "title": title,
                             "price": price,
                             "location": location,
@@ -107,16 +108,17 @@ class ProtebienesScraper(BaseScraper):
                             "source": self.portal_name
                         })
 
-                        # Stop logic
-                        if status == "existing":
-                            consecutive_existing += 1
-                        elif status == "new" or status == "updated":
-                            consecutive_existing = 0
-                        
                     except Exception as e:
                         logger.error(f"[{self.portal_name}] Error parsing card: {e}")
                         continue
 
+                # Whole page in one round trip; the stop rule still counts card by card
+                for status in await self.process_properties(candidates):
+                    if status == "existing":
+                        consecutive_existing += 1
+                    elif status == "new" or status == "updated":
+                        consecutive_existing = 0
+
                 if self.should_stop_scraping(consecutive_existing):
                     logger.info(f"[{self.portal_name}] Limit reached. Stopping.")
                     break
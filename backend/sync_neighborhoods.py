@@ -1,68 +1,87 @@
-import json
+import argparse
 import os
 import sys
 
-# Asegurar que podemos importar desde el backend
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# Asegurar que podemos importar desde el backend (sin importar el directorio actual)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from backend.neighborhood_utils import auto_resolve_neighborhood, is_neighborhood_in_map, clean_neighborhood_name
+from database import SessionLocal
+from models import DiscoveredNeighborhood
+from neighborhood_store import get_neighborhood_index, import_map_json, add_variants, export_map_json
 
-def sync_neighborhoods():
+def sync_neighborhoods(replace: bool = False, export: bool = False, suggest_min_score: float = 0.3):
     """
     Script de mantenimiento para procesar descubrimientos pendientes,
     auto-mapearlos si es posible y limpiar la lista.
+    1. Importa a la BD los cambios manuales de neighborhood_map.json.
+    2. Auto-mapea los descubrimientos que ahora se pueden resolver.
+    3. Para los que siguen sin resolver, muestra las variantes más parecidas.
+    4. Cada cambio sube la versión del mapa y se anuncia por Redis a todos los procesos.
+    Requiere el esquema al día (`alembic upgrade head`).
     """
-    map_path = "backend/neighborhood_map.json"
-    disc_path = "backend/discovered_neighborhoods.json"
-    
-    if not os.path.exists(disc_path) or not os.path.exists(map_path):
-        print("Archivos no encontrados.")
-        return
+    db = SessionLocal()
+    try:
+        imported = import_map_json(db, replace=replace)
+        if imported:
+            print(f"📥 {imported} cambios importados desde neighborhood_map.json")
 
-    with open(map_path, "r", encoding="utf-8") as f:
-        nb_map = json.load(f)
-    
-    with open(disc_path, "r", encoding="utf-8") as f:
-        discovered = json.load(f)
+        nb_index = get_neighborhood_index()
+        nb_index.reload()
 
-    if not discovered:
-        print("No hay barrios nuevos por procesar.")
-        return
-
-    print(f"--- Procesando {len(discovered)} barrios descubiertos ---")
-    
-    new_mappings = 0
-    still_unknown = []
-    
-    for item in discovered:
-        # 1. ¿Ya existe (tal vez se añadió manualmente hace poco)?
-        if is_neighborhood_in_map(item, nb_map):
-            continue
-            
-        # 2. Intentar auto-resolución
-        category = auto_resolve_neighborhood(item, nb_map)
-        if category:
-            if item not in nb_map[category]:
-                nb_map[category].append(item)
-                new_mappings += 1
-                print(f"✅ AUTO-MAPEADO: '{item}' -> '{category}'")
+        discovered = db.query(DiscoveredNeighborhood).order_by(DiscoveredNeighborhood.id).all()
+        if not discovered:
+            print("No hay barrios nuevos por procesar.")
         else:
-            still_unknown.append(item)
+            print(f"--- Procesando {len(discovered)} barrios descubiertos ---")
+
+        new_mappings = []
+        still_unknown = 0
+
+        for item in discovered:
+            # 1. ¿Ya existe (tal vez se añadió manualmente hace poco)?
+            if nb_index.contains(item.name):
+                db.delete(item)
+                continue
+
+            # 2. Intentar auto-resolución
+            category = nb_index.resolve_sector(item.name)
+            if category:
+                # En memoria primero para que los siguientes ya lo vean
+                if nb_index.add_variant(category, item.name):
+                    new_mappings.append((category, item.name))
+                    print(f"✅ AUTO-MAPEADO: '{item.name}' -> '{category}'")
+                db.delete(item)
+            else:
+                still_unknown += 1
+                # Sugerencias difusas (trigramas) para la revisión manual
+                suggestions = nb_index.suggest(item.name, k=3, min_score=suggest_min_score)
+                if suggestions:
+                    hints = ", ".join(f"{v} [{c}] {score:.2f}" for v, c, score in suggestions)
+                    print(f"❔ '{item.name}' ¿quizás?: {hints}")
+
+        # 3. Guardar cambios en el mapa (y limpiar los pendientes resueltos)
+        db.flush()
+        added = add_variants(db, new_mappings, reason="sync")
+        db.commit()
+        if added > 0:
+            print(f"\n✨ Se han añadido {added} nuevos mapeos automáticos.")
 
-    # 3. Guardar cambios en el mapa
-    if new_mappings > 0:
-        with open(map_path, "w", encoding="utf-8") as f:
-            json.dump(nb_map, f, indent=4, ensure_ascii=False)
-        print(f"\n✨ Se han añadido {new_mappings} nuevos mapeos automáticos.")
+        if still_unknown:
+            print(f"📝 Quedan {still_unknown} barrios que requieren revisión manual (GET /neighborhoods/discovered)")
+        elif discovered:
+            print("🎉 ¡Todos los barrios han sido procesados y mapeados!")
 
-    # 4. Actualizar lista de pendientes (solo los que no se pudieron mapear)
-    with open(disc_path, "w", encoding="utf-8") as f:
-        json.dump(still_unknown, f, indent=2, ensure_ascii=False)
-    
-    if still_unknown:
-        print(f"📝 Quedan {len(still_unknown)} barrios que requieren revisión manual en {disc_path}")
-    else:
-        print("🎉 ¡Todos los barrios han sido procesados y mapeados!")
+        # 4. Opcional: volcar la BD a los JSON para versionarlos en git
+        if export:
+            export_map_json(db)
+            print("💾 neighborhood_map.json y discovered_neighborhoods.json actualizados desde la BD")
+    finally:
+        db.close()
 
 if __name__ == "__main__":
-    sync_neighborhoods()
+    parser = argparse.ArgumentParser(description="Sincroniza el mapa de barrios (JSON <-> BD) y procesa descubrimientos")
+    parser.add_argument("--replace", action="store_true", help="La BD queda exactamente igual a neighborhood_map.json")
+    parser.add_argument("--export", action="store_true", help="Escribe el estado de la BD en los archivos JSON")
+    parser.add_argument("--min-score", type=float, default=0.3, help="Similitud mínima de las sugerencias difusas")
+    args = parser.parse_args()
+    sync_neighborhoods(replace=args.replace, export=args.export, suggest_min_score=args.min_score)
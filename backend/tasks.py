@@ -1,10 +1,13 @@
 import asyncio
 import logging
 from celery import shared_task
-from database import SessionLocal
+from database import SessionLocal, dispose_async_engine
 from scrapers.factory import ScraperFactory
 from core.worker import celery_app
-from crud import archive_stale_properties
+from core.redis_client import get_redis
+from core.cache import bump_data_generation
+from crud import archive_stale_properties, move_archived_properties, refresh_property_stats
+from neighborhood_store import get_neighborhood_index
 
 logger = logging.getLogger(__name__)
 
@@ -16,16 +19,49 @@ def run_async(coro):
     try:
         return loop.run_until_complete(coro)
     finally:
+        # asyncpg connections cannot outlive their loop
+        loop.run_until_complete(dispose_async_engine())
         loop.close()
 
+# Set while a debounced property_stats refresh is pending
+STATS_REFRESH_KEY = "property_stats:refresh_scheduled"
+
+def refresh_stats(db):
+    """Refresh the property_stats view and drop the cached responses that read it."""
+    try:
+        refresh_property_stats(db)
+    except Exception as e:
+        # Never fail the write that triggered it; the next refresh catches up
+        db.rollback()
+        logger.error(f"Error refreshing property stats: {e}")
+    bump_data_generation()
+
+@celery_app.task(name="refresh_property_stats")
+def refresh_property_stats_task():
+    get_redis().delete(STATS_REFRESH_KEY)
+    db = SessionLocal()
+    try:
+        refresh_stats(db)
+    finally:
+        db.close()
+
+def schedule_stats_refresh(delay: int = 30):
+    """Status edits from the UI: at most one property_stats refresh every `delay` seconds."""
+    try:
+        if get_redis().set(STATS_REFRESH_KEY, 1, nx=True, ex=delay * 4):
+            refresh_property_stats_task.apply_async(countdown=delay)
+    except Exception as e:
+        logger.warning(f"Could not schedule property stats refresh: {e}")
+
 @celery_app.task(name="scrape_portal")
 def scrape_portal_task(portal_name: str):
     logger.info(f"Starting generic scrape task for: {portal_name}")
     db = SessionLocal()
     try:
         scraper = ScraperFactory.get_scraper(portal_name, db)
-        run_async(scraper.scrape())
+        run_async(scraper.run())
         logger.info(f"Finished scraping: {portal_name}")
+        refresh_stats(db)
         return f"Scraped {portal_name}"
     except Exception as e:
         logger.error(f"Error scraping {portal_name}: {e}")
@@ -59,6 +95,8 @@ def cleanup_stale_properties_task(days: int = 3):
     db = SessionLocal()
     try:
         count = archive_stale_properties(db, days=days)
+        if count:
+            refresh_stats(db)
         logger.info(f"Archived {count} stale properties")
         return f"Archived {count} properties"
     except Exception as e:
@@ -66,3 +104,54 @@ def cleanup_stale_properties_task(days: int = 3):
         raise e
     finally:
         db.close()
+
+@celery_app.task(name="move_archived_properties")
+def move_archived_properties_task(days: int = 30):
+    """Hot/cold split: archived listings not seen for `days` leave the properties table."""
+    logger.info(f"Moving properties archived and not seen for {days} days to properties_archive")
+    db = SessionLocal()
+    try:
+        count = move_archived_properties(db, days=days)
+        if count:
+            refresh_stats(db)
+        logger.info(f"Moved {count} properties to the archive")
+        return f"Moved {count} properties"
+    except Exception as e:
+        logger.error(f"Error in archive move task: {e}")
+        raise e
+    finally:
+        db.close()
+
+# Redis key holding the neighborhood map version last applied to the properties
+APPLIED_MAP_VERSION_KEY = "neighborhood_map:applied_version"
+
+@celery_app.task(name="reclassify_properties")
+def reclassify_properties_task(force: bool = False):
+    """
+    Re-derive sector and neighborhood_normalized for stored rows,
+    but only when the neighborhood map version changed since the last run.
+    """
+    from reclassify import reclassify
+
+    version = get_neighborhood_index().version
+    redis_client = get_redis()
+    applied = redis_client.get(APPLIED_MAP_VERSION_KEY)
+    if not force and applied and applied.decode() == str(version):
+        logger.info("Neighborhood map unchanged, skipping reclassification")
+        return "Map unchanged"
+
+    logger.info(f"Reclassifying properties for neighborhood map version {version}")
+    try:
+        # Celery workers are daemonic and cannot spawn a process pool
+        stats = reclassify(workers=1)
+        if stats["updated"]:
+            db = SessionLocal()
+            try:
+                refresh_stats(db)
+            finally:
+                db.close()
+        redis_client.set(APPLIED_MAP_VERSION_KEY, version)
+        return f"Reclassified {stats['updated']} of {stats['scanned']} properties"
+    except Exception as e:
+        logger.error(f"Error in reclassify task: {e}")
+        raise e
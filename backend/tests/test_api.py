@@ -33,3 +33,93 @@ async def test_scrape_authorized():
     
     # Puede dar 400 si el portal no es válido, pero no 403
     assert response.status_code != 403
+
+@pytest.mark.asyncio
+async def test_properties_field_projection():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/properties", params={"fields": "title,price", "limit": 5})
+        assert response.status_code == 200
+        for prop in response.json():
+            assert set(prop) == {"id", "created_at", "title", "price", "days_active"}
+
+        # La vista compacta por defecto no envía la descripción
+        response = await ac.get("/properties", params={"limit": 5})
+        assert all("description" not in prop for prop in response.json())
+
+        response = await ac.get("/properties", params={"fields": "title,nope"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_search_with_colon_and_percent():
+    # El texto de búsqueda va como parámetro también al EXPLAIN de X-Total-Estimate
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        for search in ("x :10", "50% :a'b"):
+            response = await ac.get("/properties", params={"search": search, "limit": 5})
+            assert response.status_code == 200
+            assert response.headers["x-total-estimate"].isdigit()
+
+@pytest.mark.asyncio
+async def test_export_properties_streams_csv():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/properties/export", params={"format": "csv", "fields": "title,price"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert response.text.splitlines()[0] == "id,created_at,title,price,days_active"
+
+        response = await ac.get("/properties/export", params={"format": "xml"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_export_and_facets_match_the_radius_search():
+    # Mismos filtros que /properties, incluida la búsqueda por radio
+    near = {"near": "6.2310,-75.6040", "radius_km": 1.5}
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        listed = (await ac.get("/properties", params={**near, "limit": 100000, "fields": "id"})).json()
+        exported = (await ac.get("/properties/export", params={**near, "fields": "id"})).text.splitlines()
+        facets = (await ac.get("/properties/facets", params=near)).json()
+        bad = await ac.get("/properties/facets", params={"near": "nowhere"})
+    assert len(exported) == len(listed) == facets["total"]
+    assert bad.status_code == 400
+
+@pytest.mark.asyncio
+async def test_stats_etag_not_modified():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/stats")
+        tag = response.headers["etag"]
+
+        response = await ac.get("/stats", headers={"If-None-Match": tag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        # Otros filtros, otra versión
+        first = await ac.get("/properties", params={"limit": 1})
+        other = await ac.get("/properties", params={"limit": 2})
+    assert first.headers["etag"] != other.headers["etag"]
+
+@pytest.mark.asyncio
+async def test_property_facets():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/properties/facets")
+    assert response.status_code == 200
+    facets = response.json()
+    assert set(facets) == {"total", "source", "sector", "price", "bedrooms"}
+    assert sum(facets["source"].values()) == facets["total"]
+
+@pytest.mark.asyncio
+async def test_property_facets_ignore_their_own_filter():
+    # Un sector elegido sigue mostrando los demás sectores (y portales) con sus conteos
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        everything = (await ac.get("/properties/facets")).json()
+        filtered = (await ac.get("/properties/facets", params={"neighborhood": "test-no-such-sector"})).json()
+    assert filtered["total"] == 0
+    assert filtered["sector"] == everything["sector"]
+    assert filtered["source"] == {}
+
+@pytest.mark.asyncio
+async def test_neighborhoods_catalog_with_counts():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        catalog = (await ac.get("/neighborhoods")).json()
+        counts = (await ac.get("/neighborhoods", params={"counts": "true"})).json()
+    assert list(catalog)[-1] == "Sin Clasificar"
+    assert list(counts) == list(catalog)
+    assert all(isinstance(n, int) for n in counts.values())
@@ -0,0 +1,37 @@
+import threading
+import time
+import uuid
+
+from core.cache import bump_data_generation, cached
+
+def test_cache_hits_until_generation_bump():
+    namespace = f"test-{uuid.uuid4().hex}"
+    calls = []
+
+    def load():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    assert cached(namespace, {"a": 1, "b": None}, load) == {"n": 1}
+    # Same normalized params (order and None values ignored) -> hit
+    assert cached(namespace, {"a": 1}, load) == {"n": 1}
+    bump_data_generation()
+    assert cached(namespace, {"a": 1}, load) == {"n": 2}
+
+def test_concurrent_misses_are_coalesced():
+    namespace = f"test-{uuid.uuid4().hex}"
+    calls = []
+
+    def slow_load():
+        calls.append(1)
+        time.sleep(0.3)
+        return [1, 2, 3]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cached(namespace, {}, slow_load))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [[1, 2, 3]] * 8
+    assert len(calls) == 1
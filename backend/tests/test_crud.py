@@ -0,0 +1,254 @@
+import asyncio
+import datetime
+import json
+
+import pytest
+from sqlalchemy import select, text
+
+from database import AsyncSessionLocal, SessionLocal, engine, Base, dispose_async_engine
+from models import ListingFingerprint, Property, PropertyChange, SavedSearch, properties_archive
+from crud import (
+    filter_properties, listings_table, move_archived_properties, paginate_properties, restore_archived_property,
+    select_properties,
+    get_new_matches, get_price_drops, get_property_history, get_property_stats, mark_matches_seen,
+    refresh_property_stats,
+    touch_properties, upsert_properties, upsert_properties_async,
+)
+
+def test_upsert_properties_statuses():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.query(Property).filter(Property.link.like("test://upsert/%")).delete(synchronize_session=False)
+        db.commit()
+
+        batch = [
+            {"title": "Apto", "price": 1000, "location": "Belén", "link": "test://upsert/1", "area": 50},
+            {"title": "Casa", "price": 2000, "location": "Belén", "link": "test://upsert/2", "area": 80},
+            {"title": "Apto", "price": 1000, "location": "Belén", "link": "test://upsert/1", "area": 50},
+        ]
+        assert upsert_properties(db, batch) == ["new", "new", "existing"]
+        seen_ids = set()
+        assert upsert_properties(db, batch, seen_ids) == ["existing", "existing", "existing"]
+        assert len(seen_ids) == 2
+        assert touch_properties(db, seen_ids) == 2
+
+        batch[1]["price"] = 1500
+        assert upsert_properties(db, batch[:2]) == ["existing", "updated"]
+        prop = db.query(Property).filter(Property.link == "test://upsert/2").one()
+        assert prop.price == 1500
+        [change] = get_property_history(db, prop.id)
+        assert (change.field, change.old_value, change.new_value) == ("price", 2000, 1500)
+        assert [c.id for c, _ in get_price_drops(db, hours=1)][:1] == [change.id]
+
+        # A scrape that lost the price keeps the stored one (and records no change)
+        assert upsert_properties(db, [{**batch[1], "price": None, "area": None}]) == ["existing"]
+        db.refresh(prop)
+        assert prop.price == 1500
+        assert len(get_property_history(db, prop.id)) == 1
+    finally:
+        # No FK cascade: the history outlives its listing (properties_archive)
+        db.query(PropertyChange).filter(PropertyChange.property_id.in_(
+            db.query(Property.id).filter(Property.link.like("test://upsert/%")).scalar_subquery()
+        )).delete(synchronize_session=False)
+        db.query(Property).filter(Property.link.like("test://upsert/%")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+@pytest.mark.asyncio
+async def test_upsert_properties_async_concurrent_batches():
+    Base.metadata.create_all(bind=engine)
+
+    async def save(page):
+        batch = [{"title": "Apto", "price": 1000 + i, "link": f"test://upsert-async/{page}/{i}"} for i in range(20)]
+        async with AsyncSessionLocal() as session:
+            return await upsert_properties_async(session, batch)
+
+    try:
+        results = await asyncio.gather(*(save(page) for page in range(4)))
+        assert all(statuses == ["new"] * 20 for statuses in results)
+        results = await asyncio.gather(*(save(page) for page in range(4)))
+        assert all(statuses == ["existing"] * 20 for statuses in results)
+    finally:
+        await dispose_async_engine()
+        db = SessionLocal()
+        db.query(Property).filter(Property.link.like("test://upsert-async/%")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+def test_property_stats_follow_refresh():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        upsert_properties(db, [{"title": "Apto", "price": 1000, "link": "test://stats/1", "source": "test-stats"}])
+        refresh_property_stats(db)
+        assert ("test-stats", 1) in get_property_stats(db, group_by=("source",))
+        [(_, _, status, _, count)] = [r for r in get_property_stats(db, group_by=("source", "sector", "status", "day"))
+                                      if r[0] == "test-stats"]
+        assert (status, count) == ("NEW", 1)
+
+        # /stats live counts leave archived listings out
+        db.query(Property).filter(Property.link == "test://stats/1").update({Property.status: "ARCHIVED"})
+        db.commit()
+        refresh_property_stats(db)
+        assert ("test-stats", 1) not in get_property_stats(db, group_by=("source",), include_archived=False)
+        assert ("test-stats", 1) in get_property_stats(db, group_by=("source",))
+    finally:
+        db.query(Property).filter(Property.link.like("test://stats/%")).delete(synchronize_session=False)
+        db.commit()
+        refresh_property_stats(db)
+        db.close()
+
+def test_saved_search_matches_recorded_at_ingest():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    search = SavedSearch(name="test-inbox", criteria=json.dumps({
+        "source": "test-inbox", "max_price": "1500", "min_area": "", "search": "belen",
+    }))
+    db.add(search)
+    db.commit()
+    try:
+        batch = [
+            {"title": "Apto en Belén", "price": 1000, "link": "test://inbox/1", "source": "test-inbox"},
+            {"title": "Apto en Belén", "price": 2000, "link": "test://inbox/2", "source": "test-inbox"},
+            {"title": "Apto en Laureles", "price": 1000, "link": "test://inbox/3", "source": "test-inbox"},
+        ]
+        upsert_properties(db, batch)
+        assert [p.link for _, p in get_new_matches(db, search.id)] == ["test://inbox/1"]
+
+        # Price drop into range: the changed listing matches too
+        batch[1]["price"] = 1400
+        upsert_properties(db, batch)
+        assert {p.link for _, p in get_new_matches(db, search.id)} == {"test://inbox/1", "test://inbox/2"}
+        assert mark_matches_seen(db, search.id) == 2
+        assert get_new_matches(db, search.id) == []
+    finally:
+        db.query(Property).filter(Property.link.like("test://inbox/%")).delete(synchronize_session=False)
+        db.delete(search)
+        db.commit()
+        db.close()
+
+def test_cross_portal_duplicates_share_a_cluster():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    unit = {"price": 2450000, "area": 72, "bedrooms": 3, "sector": "test-dedup"}
+    try:
+        upsert_properties(db, [{**unit, "title": "Apartamento en Laureles cerca al estadio",
+                                "link": "test://dedup/a", "source": "test-portal-a"}])
+        upsert_properties(db, [
+            # Same unit on another portal: rounded area, slightly different price and title
+            {**unit, "title": "Apartamento Laureles cerca estadio", "area": 70, "price": 2500000,
+             "link": "test://dedup/b", "source": "test-portal-b"},
+            # Same agency, same unit type: not a duplicate
+            {**unit, "title": "Apartamento en Laureles cerca al estadio",
+             "link": "test://dedup/c", "source": "test-portal-a"},
+            # Nothing to compare: its own cluster right away
+            {"title": "Apartamento", "sector": "test-dedup", "link": "test://dedup/d", "source": "test-portal-b"},
+        ])
+        a, b, c, d = (db.query(Property).filter(Property.link == f"test://dedup/{k}").one() for k in "abcd")
+        assert a.listing_cluster_id == b.listing_cluster_id == a.id
+        assert c.listing_cluster_id == c.id
+        assert d.listing_cluster_id == d.id
+
+        def collapsed(**filters):
+            query = filter_properties(select_properties("link"), neighborhood="test-dedup",
+                                      collapse_duplicates=True, **filters)
+            return sorted(row.link for row in db.execute(query))
+
+        assert collapsed() == ["test://dedup/a", "test://dedup/c", "test://dedup/d"]
+        # The older listing is filtered out: the unit is still listed, from the other portal
+        assert collapsed(source="test-portal-b") == ["test://dedup/b", "test://dedup/d"]
+        assert collapsed(min_price=2480000) == ["test://dedup/b"]
+    finally:
+        db.query(ListingFingerprint).filter(ListingFingerprint.property_id.in_(
+            db.query(Property.id).filter(Property.link.like("test://dedup/%")).scalar_subquery()
+        )).delete(synchronize_session=False)
+        db.query(Property).filter(Property.link.like("test://dedup/%")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+def test_archived_properties_move_to_the_cold_table():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    # Far enough in the past that no other stored listing is moved by the test
+    long_ago = datetime.datetime(2001, 1, 15, tzinfo=datetime.timezone.utc)
+    days = (datetime.datetime.now(datetime.timezone.utc) - long_ago).days - 1
+    moved_id = None
+    try:
+        batch = [{"title": "Apto", "price": 1000, "link": f"test://archive/{i}", "source": "test-archive"} for i in range(3)]
+        upsert_properties(db, batch)
+        upsert_properties(db, [{**batch[0], "price": 900}])
+        moved_id = db.query(Property.id).filter(Property.link == "test://archive/0").scalar()
+        db.query(Property).filter(Property.link.in_(["test://archive/0", "test://archive/1"])).update(
+            {Property.status: "ARCHIVED", Property.last_seen: long_ago}, synchronize_session=False
+        )
+        # Another month: its partition is created by the batch that moves it
+        db.query(Property).filter(Property.link == "test://archive/1").update(
+            {Property.last_seen: long_ago - datetime.timedelta(days=20)}, synchronize_session=False
+        )
+        db.commit()
+        assert move_archived_properties(db, days=days, batch_size=1) == 2
+        assert [p.link for p in db.query(Property).filter(Property.source == "test-archive")] == ["test://archive/2"]
+
+        def links(show_archived):
+            query = filter_properties(select_properties("link", show_archived), source="test-archive",
+                                      show_archived=show_archived)
+            return [row.link for row in db.execute(paginate_properties(query, show_archived=show_archived))]
+
+        assert links(False) == ["test://archive/2"]
+        assert sorted(links(True)) == ["test://archive/0", "test://archive/1", "test://archive/2"]
+        archived = listings_table(True)
+        [row] = db.execute(select_properties("all", True).where(archived.c.link == "test://archive/0")).mappings()
+        assert (row["status"], row["last_seen"]) == ("ARCHIVED", long_ago)
+        # The price history survives the move
+        [change] = get_property_history(db, moved_id)
+        assert (change.old_value, change.new_value) == (1000, 900)
+
+        # Seen again by a scrape: moved back with its id and status, not listed twice
+        assert upsert_properties(db, [{**batch[0], "price": 900}]) == ["existing"]
+        back = db.query(Property).filter(Property.link == "test://archive/0").one()
+        assert (back.id, back.status) == (moved_id, "ARCHIVED")
+        assert sorted(links(True)) == ["test://archive/0", "test://archive/1", "test://archive/2"]
+
+        # Status edits from the show_archived view move the listing back too
+        archived_id = db.execute(
+            select(properties_archive.c.id).where(properties_archive.c.link == "test://archive/1")
+        ).scalar()
+        assert restore_archived_property(db, archived_id)
+        assert db.get(Property, archived_id).link == "test://archive/1"
+        assert not restore_archived_property(db, archived_id)
+
+        # An archived copy of a link that is live again stays in the archive (nothing is lost)
+        live = db.query(Property).filter(Property.link == "test://archive/2").one()
+        copy_id = live.id + 10**9
+        db.execute(properties_archive.insert().values(
+            id=copy_id, title="Apto", link=live.link, status="ARCHIVED", last_seen=long_ago
+        ))
+        db.commit()
+        assert not restore_archived_property(db, copy_id)
+        assert db.execute(select(properties_archive.c.link).where(properties_archive.c.id == copy_id)).scalar() == live.link
+    finally:
+        db.query(Property).filter(Property.link.like("test://archive/%")).delete(synchronize_session=False)
+        db.query(PropertyChange).filter(PropertyChange.property_id == moved_id).delete(synchronize_session=False)
+        db.execute(properties_archive.delete().where(properties_archive.c.link.like("test://archive/%")))
+        db.execute(text("DROP TABLE IF EXISTS properties_archive_2001_01, properties_archive_2000_12"))
+        db.commit()
+        db.close()
+
+def test_search_ignores_accents_and_case():
+    db = SessionLocal()
+    try:
+        upsert_properties(db, [{"title": "Apartamento en Belén Rosales", "price": 1000, "location": "Medellín",
+                                "link": "test://search/1", "source": "test-search"}])
+        for search in ("belen rosales", "BELÉN", "Belen"):
+            query = filter_properties(select_properties("link"), source="test-search", search=search)
+            assert [row.link for row in db.execute(query)] == ["test://search/1"]
+        query = filter_properties(select_properties("link"), source="test-search", search="belena")
+        assert db.execute(query).all() == []
+    finally:
+        db.query(ListingFingerprint).filter(ListingFingerprint.property_id.in_(
+            db.query(Property.id).filter(Property.link.like("test://search/%")).scalar_subquery()
+        )).delete(synchronize_session=False)
+        db.query(Property).filter(Property.link.like("test://search/%")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
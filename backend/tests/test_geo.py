@@ -0,0 +1,44 @@
+import json
+import math
+import random
+
+import pytest
+
+from geo import Gazetteer, covering_prefixes, geohash_encode, haversine_km, parse_point
+from neighborhood_utils import NEIGHBORHOOD_MAP_PATH
+
+def test_geohash_encode():
+    assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geohash_encode(57.64911, 10.40744, 5) == "u4pru"
+
+def test_covering_prefixes_contain_every_point_in_radius():
+    rng = random.Random(7)
+    lat, lon = 6.2442, -75.5812
+    for radius_km in (0.1, 0.5, 1, 3, 10):
+        prefixes = covering_prefixes(lat, lon, radius_km)
+        for _ in range(300):
+            # Random point at distance <= radius
+            d, bearing = radius_km * math.sqrt(rng.random()), rng.random() * 2 * math.pi
+            plat = lat + (d / 111.195) * math.cos(bearing)
+            plon = lon + (d / (111.195 * math.cos(math.radians(lat)))) * math.sin(bearing)
+            if haversine_km(lat, lon, plat, plon) <= radius_km:
+                assert any(geohash_encode(plat, plon).startswith(p) for p in prefixes), (radius_km, plat, plon)
+
+def test_gazetteer_covers_neighborhood_map():
+    gazetteer = Gazetteer()
+    with open(NEIGHBORHOOD_MAP_PATH, encoding="utf-8") as f:
+        nb_map = json.load(f)
+    for sector, variants in nb_map.items():
+        for variant in variants:
+            located = gazetteer.locate(sector, variant)
+            assert located or sector == "Otros Municipios", (sector, variant)
+    # Variant centroid when known, sector centroid otherwise
+    assert gazetteer.centroid("C14 - El Poblado", "Provenza") != gazetteer.centroid("C14 - El Poblado")
+    assert gazetteer.centroid("C14 - El Poblado", "Variante Nueva") == gazetteer.centroid("C14 - El Poblado")
+    assert gazetteer.locate("Sin Clasificar") == {}
+
+def test_parse_point():
+    assert parse_point("6.21,-75.57") == (6.21, -75.57)
+    for bad in ("6.21", "a,b", "95,-75"):
+        with pytest.raises(ValueError):
+            parse_point(bad)
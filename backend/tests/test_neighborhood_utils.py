@@ -0,0 +1,79 @@
+import json
+import os
+import time
+
+import neighborhood_store
+from database import SessionLocal
+from models import NeighborhoodVariant
+from neighborhood_utils import NeighborhoodIndex, auto_resolve_neighborhood, clean_neighborhood_name
+
+NB_MAP = {
+    "C10 - La Candelaria": ["Prado", "Centro"],
+    "C12 - La América": ["Calasanz", "La América"],
+    "C15 - Guayabal": ["Santa Fe"],
+    "Corregimientos": ["Prado Verde", "San Antonio de Prado"],
+    "Otros Municipios": ["Santa Fe de Antioquia"],
+}
+
+def test_clean_neighborhood_name():
+    assert clean_neighborhood_name("Barrio Belén, Medellín") == "belen"
+
+def test_resolve_prefers_longest_variant():
+    index = NeighborhoodIndex.from_map(NB_MAP)
+    assert index.resolve("Casa en Prado Verde, Medellín") == ("Corregimientos", "Prado Verde")
+    assert index.resolve("Santa Fe de Antioquia") == ("Otros Municipios", "Santa Fe de Antioquia")
+    assert index.resolve("Calasanz, Medellín") == ("C12 - La América", "Calasanz")
+    assert index.resolve("Medellín") == (None, None)
+
+def test_index_matches_legacy_helpers():
+    index = NeighborhoodIndex.from_map(NB_MAP)
+    for text in ["Apartamento en Santa Fe", "La América", "prado", "Sabaneta"]:
+        assert index.resolve_sector(text) == auto_resolve_neighborhood(text, NB_MAP)
+    assert index.contains("SANTA FE")
+    assert not index.contains("Belén")
+
+def test_index_reloads_when_file_changes(tmp_path):
+    path = tmp_path / "neighborhood_map.json"
+    path.write_text(json.dumps(NB_MAP), encoding="utf-8")
+    index = NeighborhoodIndex(path=str(path), check_interval=0)
+    assert index.resolve_sector("Belén Rosales") is None
+
+    updated = dict(NB_MAP, **{"C16 - Belén": ["Belén"]})
+    path.write_text(json.dumps(updated), encoding="utf-8")
+    future = time.time() + 5
+    os.utime(path, (future, future))
+    assert index.resolve_sector("Belén Rosales") == "C16 - Belén"
+
+def test_classify_falls_back_to_title():
+    index = NeighborhoodIndex.from_map(NB_MAP)
+    assert index.classify("Medellín, Antioquia", "Apartamento en Calasanz") == ("C12 - La América", "Calasanz")
+    assert index.classify("Medellín", "Apartamento") == ("Sin Clasificar", None)
+
+def test_suggest_ranks_misspellings_by_trigram_similarity():
+    index = NeighborhoodIndex.from_map(NB_MAP)
+    variant, sector, score = index.suggest("Calasans", k=1)[0]
+    assert (variant, sector) == ("Calasanz", "C12 - La América")
+    assert 0 < score < 1
+    assert index.suggest("zzzz") == []
+    assert index.classify("Calasans, Medellín", "", fuzzy_threshold=0.5) == ("C12 - La América", "Calasanz")
+    assert index.classify("Calasans, Medellín", "") == ("Sin Clasificar", None)
+
+def test_import_map_json_publishes_deletions(tmp_path, monkeypatch):
+    published = []
+    monkeypatch.setattr(neighborhood_store, "publish_map_version", published.append)
+    db = SessionLocal()
+    try:
+        nb_map, _ = neighborhood_store.load_map(db)
+        path = tmp_path / "neighborhood_map.json"
+        path.write_text(json.dumps(nb_map), encoding="utf-8")
+        neighborhood_store.add_variants(db, [("C16 - Belén", "Barrio de prueba")], reason="test")
+        published.clear()
+
+        # Solo se borra la variante extra: la versión nueva también se anuncia
+        assert neighborhood_store.import_map_json(db, str(path), replace=True) == 1
+        assert published == [neighborhood_store.current_version(db)]
+        assert neighborhood_store.load_map(db)[0] == nb_map
+    finally:
+        db.query(NeighborhoodVariant).filter(NeighborhoodVariant.name == "Barrio de prueba").delete()
+        db.commit()
+        db.close()
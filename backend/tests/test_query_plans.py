@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from database import SessionLocal
+from models import Property
+from crud import decode_cursor, encode_cursor, filter_properties, paginate_properties
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+def _plan(db, query):
+    sql = query.statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    [plan] = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    return list(_plan_nodes(plan["Plan"]))
+
+def _seed(db, rows=20000):
+    """Enough listings (in the test transaction, rolled back) for the planner to prefer indexes honestly."""
+    db.execute(text(
+        "INSERT INTO properties (title, price, link, source, sector, status, created_at)"
+        " SELECT 'Apto', 1000000 + i, 'test://plans/' || i,"
+        " (ARRAY['fincaraiz', 'santafe', 'panda', 'elcastillo'])[1 + i % 4],"
+        " (ARRAY['C16 - Belén', 'C14 - El Poblado', 'C11 - Laureles - Estadio', 'Envigado', 'Itagüí'])[1 + i % 5],"
+        " CASE WHEN i % 10 = 0 THEN 'ARCHIVED' ELSE 'NEW' END,"
+        " now() - i * interval '1 minute'"
+        f" FROM generate_series(1, {rows}) AS i"
+    ))
+    db.execute(text("ANALYZE properties"))
+
+def test_default_listing_query_uses_an_index():
+    # The ORDER BY must come from the matching partial index (no Seq Scan, no full Sort),
+    # on the first page and after a keyset cursor alike
+    db = SessionLocal()
+    try:
+        _seed(db)
+        cursor = encode_cursor(datetime.utcnow(), 2**31 - 1)
+        for filters, index in (
+            ({}, "ix_properties_visible_created"),
+            ({"source": "fincaraiz"}, "ix_properties_visible_source_keyset"),
+            ({"neighborhood": "C16 - Belén"}, "ix_properties_visible_sector_keyset"),
+        ):
+            for page in (None, cursor):
+                query = paginate_properties(filter_properties(db.query(Property), **filters), page).limit(500)
+                nodes = _plan(db, query)
+                assert index in {node.get("Index Name") for node in nodes}, (filters, page)
+                assert not any(node["Node Type"] in ("Seq Scan", "Sort") for node in nodes), (filters, page)
+    finally:
+        db.rollback()
+        db.close()
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
@@ -0,0 +1,58 @@
+import pytest
+
+import reclassify
+from database import SessionLocal
+from models import Property
+from neighborhood_store import get_neighborhood_index
+from neighborhood_utils import UNCLASSIFIED_SECTOR
+
+SOURCE = "test-reclassify"
+
+def _stored(db):
+    db.expire_all()
+    rows = db.query(Property).filter(Property.source == SOURCE).order_by(Property.id)
+    return [(p.sector, p.neighborhood_normalized) for p in rows]
+
+def test_reclassify_updates_rows_and_resumes_from_checkpoint(tmp_path, monkeypatch):
+    index = get_neighborhood_index()
+    variant = next(name for names in index.nb_map.values() for name in names)
+    expected = index.classify(f"{variant}, Medellín", "Apartamento")
+    assert expected[0] != UNCLASSIFIED_SECTOR
+    checkpoint = str(tmp_path / "checkpoint.json")
+
+    db = SessionLocal()
+    try:
+        db.query(Property).filter(Property.source == SOURCE).delete(synchronize_session=False)
+        db.add_all(Property(title="Apartamento", location=f"{variant}, Medellín", source=SOURCE,
+                            link=f"test://reclassify/{i}") for i in range(4))
+        db.commit()
+
+        # Interrupted after the first chunk: only its two rows are written (and checkpointed)
+        write_changes = reclassify.write_changes
+        calls = []
+
+        def failing_write(changes):
+            calls.append(changes)
+            if len(calls) > 1:
+                raise RuntimeError("interrupted")
+            return write_changes(changes)
+
+        monkeypatch.setattr(reclassify, "write_changes", failing_write)
+        with pytest.raises(RuntimeError):
+            reclassify.reclassify(source=SOURCE, chunk_size=2, workers=1, checkpoint_path=checkpoint)
+        assert _stored(db) == [expected] * 2 + [(None, None)] * 2
+
+        # The resumed run starts after the checkpoint: the rows reset here stay untouched
+        monkeypatch.setattr(reclassify, "write_changes", write_changes)
+        db.query(Property).filter(Property.link.in_(["test://reclassify/0", "test://reclassify/1"])).update(
+            {Property.sector: None, Property.neighborhood_normalized: None}, synchronize_session=False
+        )
+        db.commit()
+        stats = reclassify.reclassify(source=SOURCE, chunk_size=2, workers=1, resume=True,
+                                      checkpoint_path=checkpoint)
+        assert (stats["scanned"], stats["updated"]) == (2, 2)
+        assert _stored(db) == [(None, None)] * 2 + [expected] * 2
+    finally:
+        db.query(Property).filter(Property.source == SOURCE).delete(synchronize_session=False)
+        db.commit()
+        db.close()
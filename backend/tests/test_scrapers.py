@@ -0,0 +1,64 @@
+from database import SessionLocal
+from geo import get_gazetteer
+from models import DiscoveredNeighborhood
+from neighborhood_store import get_neighborhood_index
+from neighborhood_utils import clean_neighborhood_name
+from scrapers.base import BaseScraper
+from scrapers.config import SEARCH_CRITERIA, NeighborhoodDiscoveryBuffer
+
+
+class _Scraper(BaseScraper):
+    async def scrape(self):
+        pass
+
+
+def test_filter_candidates_runs_cheap_checks_first():
+    index = get_neighborhood_index()
+    variant = next(name for names in index.nb_map.values() for name in names)
+    over_price = SEARCH_CRITERIA["max_price"] + 1
+    scraper = _Scraper(db=None)
+    batch = [
+        # Price goes first: counted once, and its location is never looked at
+        {"title": "Apartamento", "price": over_price, "location": "Barrio Caro, Bogotá", "link": "test://filter/0"},
+        {"title": "Apartamento", "price": 1000, "location": "Chapinero, Bogotá", "link": "test://filter/1"},
+        {"title": "Apartamento", "price": 1000, "location": f"{variant}, Medellín", "link": "test://filter/2"},
+        {"title": "Apartamento", "price": None, "location": "Medellín", "link": "test://filter/3",
+         "sector": "C10 - La Candelaria", "neighborhood_normalized": "Prado"},
+    ]
+
+    survivors = scraper.filter_candidates(batch)
+    assert [d["link"] for d in survivors] == ["test://filter/2", "test://filter/3"]
+    assert scraper.skip_counts == {"price": 1, "zone": 1}
+    assert set(scraper.discovery.discovered) == {"chapinero", "bogota"}
+
+    classified, preset = survivors
+    assert (classified["sector"], classified["neighborhood_normalized"]) == index.classify(f"{variant}, Medellín", "Apartamento")
+    assert classified["source"] == "generic"
+    # Coordinates come from the sector assigned just before (or the one the portal gave)
+    for data in survivors:
+        assert data["geohash"] == get_gazetteer().locate(data["sector"], data["neighborhood_normalized"])["geohash"]
+    assert preset["sector"] == "C10 - La Candelaria"
+
+
+def test_discovery_buffer_flushes_each_clean_name_once():
+    names = ["Zzq Barrio de Prueba", "zzq barrio de prueba", "ZZQ Barrio de Prueba "]
+    clean_name = clean_neighborhood_name(names[0])
+    buffer = NeighborhoodDiscoveryBuffer()
+    db = SessionLocal()
+    try:
+        for name in names:
+            buffer.record(name)
+        assert buffer.discovered == {clean_name: names[0]}
+
+        buffer.flush(db)
+        rows = db.query(DiscoveredNeighborhood).filter(DiscoveredNeighborhood.clean_name == clean_name).all()
+        assert [row.name for row in rows] == [names[0]]
+        assert not buffer.discovered
+
+        # Already seen in this run: nothing left to write
+        buffer.record(names[1])
+        assert not buffer.discovered
+    finally:
+        db.query(DiscoveredNeighborhood).filter(DiscoveredNeighborhood.clean_name == clean_name).delete()
+        db.commit()
+        db.close()
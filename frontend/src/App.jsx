@@ -20,6 +20,9 @@ function App() {
 
   // Keep track of current filters for refresh actions
   const [currentFilters, setCurrentFilters] = useState({});
+  // Cursor of the next page (X-Next-Cursor), null when there are no more results
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const fetchStats = async () => {
     try {
@@ -34,31 +37,37 @@ function App() {
     }
   };
 
+  const buildParams = (filters, cursor = null) => {
+    // Construct Query Params
+    const params = new URLSearchParams({ limit: 1000 });
+
+    if (filters.source) params.append('source', filters.source);
+    if (filters.search) params.append('search', filters.search);
+    if (filters.min_price) params.append('min_price', filters.min_price);
+    if (filters.max_price) params.append('max_price', filters.max_price);
+    if (filters.min_area) params.append('min_area', filters.min_area);
+    if (filters.max_area) params.append('max_area', filters.max_area);
+    if (filters.neighborhood) params.append('neighborhood', filters.neighborhood);
+    if (filters.show_archived) params.append('show_archived', 'true');
+    if (cursor) params.append('cursor', cursor);
+    return params;
+  };
+
   const fetchProperties = async (filters = {}) => {
     setLoading(true);
     try {
-      // Construct Query Params
-      const params = new URLSearchParams({ limit: 1000 }); // Increased limit for all current data
-
-      if (filters.source) params.append('source', filters.source);
-      if (filters.search) params.append('search', filters.search);
-      if (filters.min_price) params.append('min_price', filters.min_price);
-      if (filters.max_price) params.append('max_price', filters.max_price);
-      if (filters.min_area) params.append('min_area', filters.min_area);
-      if (filters.max_area) params.append('max_area', filters.max_area);
-      if (filters.neighborhood) params.append('neighborhood', filters.neighborhood);
-      if (filters.show_archived) params.append('show_archived', 'true');
-
-      const response = await fetch(`${API_BASE_URL}/properties?${params.toString()}`);
+      const response = await fetch(`${API_BASE_URL}/properties?${buildParams(filters).toString()}`);
       const data = await response.json();
 
       setProperties(data);
+      setNextCursor(response.headers.get('X-Next-Cursor'));
       if (Object.keys(filters).length === 0) {
         // If no filters, also update stats to keep in sync
         fetchStats();
       } else {
-        // If filtering, update local total only for the UI
-        setStats(prev => ({ ...prev, total: data.length }));
+        // If filtering, show the server's estimate of the filtered total (not just the loaded page)
+        const estimate = Number(response.headers.get('X-Total-Estimate'));
+        setStats(prev => ({ ...prev, total: Number.isFinite(estimate) && estimate > 0 ? estimate : data.length }));
       }
     } catch (error) {
       console.error("Error fetching properties:", error);
@@ -67,6 +76,21 @@ function App() {
     }
   };
 
+  const fetchMoreProperties = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const response = await fetch(`${API_BASE_URL}/properties?${buildParams(currentFilters, nextCursor).toString()}`);
+      const data = await response.json();
+      setProperties(prev => [...prev, ...data]);
+      setNextCursor(response.headers.get('X-Next-Cursor'));
+    } catch (error) {
+      console.error("Error fetching more properties:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleFilterChange = (newFilters) => {
     setCurrentFilters(newFilters);
     fetchProperties(newFilters);
@@ -91,8 +115,18 @@ function App() {
     }
   };
 
-  const handleSelectProperty = (property) => {
+  const handleSelectProperty = async (property) => {
     setSelectedProperty(property);
+    // The list only carries the compact card; the description comes from the detail endpoint
+    try {
+      const response = await fetch(`${API_BASE_URL}/properties/${property.id}`);
+      if (response.ok) {
+        const detail = await response.json();
+        setSelectedProperty(current => (current && current.id === detail.id ? detail : current));
+      }
+    } catch (error) {
+      console.error("Error fetching property detail:", error);
+    }
   };
 
   const handleCloseModal = () => {
@@ -168,11 +202,20 @@ function App() {
         {loading ? (
           <div className="loading-state">Cargando datos...</div>
         ) : (
-          <PropertiesTable
-            properties={properties}
-            onStatusChange={handleStatusChange}
-            onSelectProperty={handleSelectProperty}
-          />
+          <>
+            <PropertiesTable
+              properties={properties}
+              onStatusChange={handleStatusChange}
+              onSelectProperty={handleSelectProperty}
+            />
+            {nextCursor && (
+              <div className="load-more">
+                <button className="action-btn secondary" onClick={fetchMoreProperties} disabled={loadingMore}>
+                  {loadingMore ? 'Cargando...' : 'Cargar más'}
+                </button>
+              </div>
+            )}
+          </>
         )}
       </main>
 
@@ -15,24 +15,41 @@ const FiltersBar = ({ onFilterChange, portals }) => {
     });
 
     const [savedSearches, setSavedSearches] = useState([]);
-    const [neighborhoods, setNeighborhoods] = useState({});
+    // Counts per source/sector for the applied filters (one /properties/facets request)
+    const [facets, setFacets] = useState({ source: {}, sector: {} });
     const [searchName, setSearchName] = useState('');
     const [isSaving, setIsSaving] = useState(false);
 
     useEffect(() => {
         loadSavedSearches();
-        loadNeighborhoods();
+        loadFacets({});
     }, []);
 
-    const loadNeighborhoods = async () => {
+    const loadFacets = async (applied) => {
+        const params = new URLSearchParams();
+        ['source', 'search', 'min_price', 'max_price', 'min_area', 'max_area', 'neighborhood'].forEach(key => {
+            if (applied[key]) params.append(key, applied[key]);
+        });
+        if (applied.show_archived) params.append('show_archived', 'true');
         try {
-            const res = await fetch(`${API_BASE_URL}/neighborhoods`);
-            if (res.ok) setNeighborhoods(await res.json());
+            const res = await fetch(`${API_BASE_URL}/properties/facets?${params.toString()}`);
+            if (res.ok) setFacets(await res.json());
         } catch (e) {
-            console.error("Error loading neighborhoods", e);
+            console.error("Error loading facets", e);
         }
     };
 
+    // Sectors with results, "Sin Clasificar" last; the selected one is always listed
+    const sectorOptions = Object.keys(facets.sector)
+        .filter(nb => nb !== 'Sin Clasificar')
+        .sort()
+        .concat('Sin Clasificar' in facets.sector ? ['Sin Clasificar'] : []);
+    if (filters.neighborhood && !sectorOptions.includes(filters.neighborhood)) {
+        sectorOptions.push(filters.neighborhood);
+    }
+
+    const withCount = (label, count) => (count !== undefined ? `${label} (${count})` : label);
+
     const loadSavedSearches = async () => {
         try {
             const res = await fetch(`${API_BASE_URL}/searches`);
@@ -53,6 +70,7 @@ const FiltersBar = ({ onFilterChange, portals }) => {
     const handleSubmit = (e) => {
         e.preventDefault();
         onFilterChange(filters);
+        loadFacets(filters);
     };
 
     const handleReset = () => {
@@ -68,6 +86,7 @@ const FiltersBar = ({ onFilterChange, portals }) => {
         };
         setFilters(resetState);
         onFilterChange(resetState);
+        loadFacets(resetState);
     };
 
     const handleSaveSearch = async () => {
@@ -93,6 +112,7 @@ const FiltersBar = ({ onFilterChange, portals }) => {
         setFilters(searchItem.criteria);
         // Automatically trigger filter
         onFilterChange(searchItem.criteria);
+        loadFacets(searchItem.criteria);
     };
 
     const deleteSearch = async (id, e) => {
@@ -134,7 +154,7 @@ const FiltersBar = ({ onFilterChange, portals }) => {
                     <select name="source" value={filters.source} onChange={handleChange} className="filter-select">
                         <option value="">Todos los Portales</option>
                         {portals.map(p => (
-                            <option key={p} value={p}>{p}</option>
+                            <option key={p} value={p}>{withCount(p, facets.source[p])}</option>
                         ))}
                     </select>
                 </div>
@@ -142,8 +162,8 @@ const FiltersBar = ({ onFilterChange, portals }) => {
                 <div className="filter-group">
                     <select name="neighborhood" value={filters.neighborhood} onChange={handleChange} className="filter-select">
                         <option value="">Todos los Sectores</option>
-                        {Object.keys(neighborhoods).map(nb => (
-                            <option key={nb} value={nb}>{nb}</option>
+                        {sectorOptions.map(nb => (
+                            <option key={nb} value={nb}>{withCount(nb, facets.sector[nb])}</option>
                         ))}
                     </select>
                 </div>